@@ -0,0 +1,124 @@
+"""
+Benchmark the EPG HTML parser backends on saved schedule pages.
+
+    python scripts/bench_epg_html.py --save [DIR]      # fetch one page per scraper into DIR
+    python scripts/bench_epg_html.py [DIR] [--rounds N]
+
+Fixtures are DIR/<scraper>*.html (e.g. scrape_tvgenie.html, scrape_epgpw-wion.html),
+default scripts/epg_fixtures/. None are committed (the pages change daily and belong
+to the sites), so run --save first.
+Each scraper runs offline on every fixture with each installed backend: best time
+per page, speed-up over html.parser, and whether the programmes match html.parser's.
+tvwish pages are saved over plain HTTP; replace them with a browser-saved copy
+("Save page as…") to include the rendered #divUpcoming section.
+"""
+import argparse
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+
+import epg_html
+import epg_http
+import epg_scraper
+
+DEFAULT_DIR = Path(__file__).resolve().parent / "epg_fixtures"
+
+
+class _Page:
+    def __init__(self, text):
+        self.text = text
+
+
+def _tvwish_offline(channel_id, display_name, logo_url, url):
+    """The parsing half of scrape_tvwish on an already rendered page."""
+    soup = epg_html.parse(epg_http.get(url).text)
+    programmes = epg_scraper._parse_upcoming_tvwish(soup, datetime.now())
+    current = soup.select_one("div.prog-list h4")
+    return {"programmes": programmes, "current": current.get_text(strip=True) if current else None}
+
+
+def scrapers():
+    """Scraper name → (callable, sample CHANNELS entry) for every scraper in CHANNELS."""
+    found = {}
+    for ch_id, (name, logo, url, func) in epg_scraper.CHANNELS.items():
+        if func.__name__ not in found:
+            run = _tvwish_offline if func == epg_scraper.scrape_tvwish else func
+            found[func.__name__] = (run, (ch_id, name, logo, url))
+    return found
+
+
+def save(directory: Path):
+    directory.mkdir(parents=True, exist_ok=True)
+    for scraper, (_run, (_id, name, _logo, url)) in scrapers().items():
+        try:
+            text = epg_http.get(url).text
+        except Exception as e:
+            print(f"⚠️  {scraper}: {url} failed: {e}")
+            continue
+        (directory / f"{scraper}.html").write_text(text, encoding="utf-8")
+        print(f"💾 {scraper}: {name} → {directory / (scraper + '.html')}")
+
+
+def run_offline(run, entry, text, backend):
+    epg_html.PARSER = backend
+    epg_http.get = lambda url, timeout=None: _Page(text)
+    return run(*entry)
+
+
+def best_ms(fn, rounds: int) -> float:
+    """Best-of-N wall time in milliseconds (least disturbed by other load)."""
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory", nargs="?", type=Path, default=DEFAULT_DIR)
+    parser.add_argument("--save", action="store_true", help="fetch fresh fixtures into the directory")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.save:
+        save(args.directory)
+        return
+
+    paths = sorted(args.directory.glob("*.html"))
+    if not paths:
+        print(f"⚠️  No fixtures in {args.directory}. Save some with --save first.")
+        return
+
+    logging.disable(logging.CRITICAL)  # the scrapers log every page
+    backends = [b for b in epg_html.BACKENDS if epg_html.available(b)]
+    others = [b for b in backends if b != "html.parser"]
+    print(f"backends: {', '.join(backends)}")
+    print(f"{'fixture':<32} {'KB':>5} {'html.parser':>11} "
+          + " ".join(f"{b:>11} {'x':>5}" for b in others) + "  same   (times in ms)")
+
+    found = scrapers()
+    for path in paths:
+        scraper = next((s for s in found if path.name.startswith(s)), None)
+        if scraper is None:
+            print(f"⚠️  {path.name}: no scraper named like it. Skipping.")
+            continue
+        run, entry = found[scraper]
+        text = path.read_text(encoding="utf-8")
+
+        baseline = run_offline(run, entry, text, "html.parser")
+        base_ms = best_ms(lambda: run_offline(run, entry, text, "html.parser"), args.rounds)
+        cells, same = [], True
+        for backend in others:
+            same &= run_offline(run, entry, text, backend) == baseline
+            ms = best_ms(lambda: run_offline(run, entry, text, backend), args.rounds)
+            cells.append(f"{ms:>11.2f} {base_ms / ms:>5.1f}")
+
+        print(f"{path.name[:32]:<32} {len(text.encode('utf-8')) // 1024:>5} {base_ms:>11.2f} "
+              + " ".join(cells) + f"  {'✅' if same else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
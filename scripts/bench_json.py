@@ -0,0 +1,64 @@
+"""
+Benchmark json_fast against stdlib json on the repo's own data files.
+
+    python scripts/bench_json.py [--rounds N] [files...]
+
+For each file: parse time (loads) and write time (dumps, indent=2 as the scripts
+write it) for both layers, the speed-up, and whether the bytes are identical.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import json_fast
+
+_root = Path(__file__).resolve().parent.parent
+DEFAULT_FILES = [
+    _root / "static_channels.json",
+    _root / "static_movies.json",
+    _root / "scripts" / "static_movies(ctgfun).json",
+    _root / "scripts" / "static_movies(103.225.94.27).json",
+    _root / "scripts" / "YT_channels.json",
+]
+
+
+def best_ms(fn, rounds: int) -> float:
+    """Best-of-N wall time in milliseconds (least disturbed by other load)."""
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="*", type=Path, default=DEFAULT_FILES)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"json_fast backend: {json_fast.BACKEND}")
+    print(f"{'file':<36} {'KB':>6} {'load std':>9} {'load fast':>9} {'x':>5} "
+          f"{'dump std':>9} {'dump fast':>9} {'x':>5}  same   (times in ms)")
+    for path in args.files:
+        if not path.exists():
+            print(f"⚠️  {path} not found. Skipping.")
+            continue
+        text = path.read_text(encoding="utf-8")
+        data = json.loads(text)
+
+        load_std = best_ms(lambda: json.loads(text), args.rounds)
+        load_fast = best_ms(lambda: json_fast.loads(text), args.rounds)
+        dump_std = best_ms(lambda: json.dumps(data, ensure_ascii=False, indent=2), args.rounds)
+        dump_fast = best_ms(lambda: json_fast.dumps(data, indent=2), args.rounds)
+        same = json.dumps(data, ensure_ascii=False, indent=2) == json_fast.dumps(data, indent=2)
+
+        print(f"{path.name[:36]:<36} {len(text.encode('utf-8')) // 1024:>6} "
+              f"{load_std:>9.2f} {load_fast:>9.2f} {load_std / load_fast:>5.1f} "
+              f"{dump_std:>9.2f} {dump_fast:>9.2f} {dump_std / dump_fast:>5.1f}  {'✅' if same else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
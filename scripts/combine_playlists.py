@@ -1,7 +1,18 @@
-from dataclasses import dataclass
 from collections import defaultdict, Counter
 from datetime import datetime, timezone, timedelta
-import json, re, functools, time, os
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack
+from operator import attrgetter
+from typing import Iterable
+import re, functools, time, os, gzip
+
+import json_fast
+from models import Channel, Item, Movie, MovieLink, SchemaError
+
+try:
+    import brotli  # optional: adds a .br variant of the playlist
+except ImportError:
+    brotli = None
 
 # ---------- simple console helpers (no colors)
 
@@ -26,9 +37,18 @@ CTG_FUN_MOVIES_JSON = "scripts/static_movies(ctgfun).json"
 CINEHUB_MOVIES_JSON = "scripts/static_movies(cinehub24).json"
 Infobase_MOVIES_JSON = "scripts/static_movies(103.225.94.27).json"
 OUTPUT_FILE = "combined.m3u"
+# Compressed copies written in the same pass: OUTPUT_FILE.gz, and OUTPUT_FILE.br if brotli is installed
+COMPRESS_OUTPUT = os.getenv("COMPRESS_OUTPUT", "1") == "1"
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "9"))  # 9: ~60 ms on 1 MB; 11 is ~40x slower for ~9% smaller
+WRITE_BUFFER = 1 << 20  # bytes per sink before hitting the disk
 RECENT_TAG = " 🆕"
 RECENT_DAYS = 30
 
+# Source loaders run serially by default: the whole load is ~100 ms and shipping the
+# Items back from a process pool costs more than it saves. N > 1 = a pool of N
+# processes (for much larger sources on a multi-core runner). Output is identical either way.
+LOADER_WORKERS = int(os.getenv("LOADER_WORKERS", "1"))
+
 GROUP_ORDER = [
     "Bangla",
     "Bangla News",
@@ -59,23 +79,30 @@ MOVIE_GROUPS = {
 
 # ---------- helpers
 
-@dataclass
-class Item:
-    header: str
-    link: str
-    group: str
-    tvg_id: str | None
-    tvg_logo: str | None
-    is_movie: bool
-    year: int = -1
-    name: str = ""
-    recent: bool = False
-    added_dt: datetime | None = None  # <-- MODIFIED
-    # lower is preferred (0 = ctgfun/cinehub json, 1 = movies json, 2 = yt/json, 3 = m3u)
-    source_rank: int = 99
-
-def channel_display_name(header: str) -> str:
-    return header.split(",", 1)[-1].strip()
+# ---------- EXTINF attributes (shared by the parser and the writer)
+
+_EXTINF_DURATION_RE = re.compile(r'\s*(-?\d+(?:\.\d+)?)')
+_EXTINF_ATTR_RE = re.compile(r'\s*([A-Za-z0-9_-]+)=(?:"([^"]*)"|\'([^\']*)\'|([^\s,"]*))')
+
+def parse_extinf(line: str) -> tuple[str, dict[str, str], str]:
+    """
+    Tokenize one '#EXTINF:<duration> k="v" ...,<title>' line in a single left-to-right
+    scan. Returns (duration, attrs, title); values may be "double", 'single' or un-quoted,
+    commas inside quoted values are kept.
+    """
+    body = line[len("#EXTINF:"):]
+    m = _EXTINF_DURATION_RE.match(body)
+    duration, pos = (m.group(1), m.end()) if m else ("-1", 0)
+    attrs: dict[str, str] = {}
+    while (m := _EXTINF_ATTR_RE.match(body, pos)) is not None:
+        attrs[m.group(1)] = next(v for v in m.group(2, 3, 4) if v is not None)
+        pos = m.end()
+    title = body[pos:].partition(",")[2].strip()
+    return duration, attrs, title
+
+def format_extinf(attrs: dict[str, str], title: str, duration: str = "-1") -> str:
+    pairs = "".join(f' {k}="{v}"' for k, v in attrs.items())
+    return f"#EXTINF:{duration}{pairs},{title}"
 
 def normalize_year(y) -> int:
     try:
@@ -90,8 +117,10 @@ def extract_year_from_title(title: str) -> int:
     m = re.search(r'\b(19|20)\d{2}\b', title)
     return int(m.group(0)) if m else -1
 
+@functools.lru_cache(maxsize=8192)
 def parse_iso_utc(date_str: str | None) -> datetime | None:
-    """Parse ISO-like strings to UTC; return None if invalid/missing."""
+    """Parse ISO-like strings to UTC; return None if invalid/missing.
+    Memoised: 'added' values repeat heavily (mostly plain YYYY-MM-DD dates)."""
     if not date_str:
         return None
     try:
@@ -105,10 +134,9 @@ def parse_iso_utc(date_str: str | None) -> datetime | None:
     except Exception:
         return None
 
-def is_recent(date_str: str | None, days: int) -> bool:
-    dt = parse_iso_utc(date_str)
-    if not dt: return False
-    return (datetime.now(timezone.utc) - dt) <= timedelta(days=days)
+def is_recent_dt(dt: datetime | None, now: datetime) -> bool:
+    """True if dt falls within RECENT_DAYS of the run's `now`."""
+    return dt is not None and (now - dt) <= timedelta(days=RECENT_DAYS)
 
 def generate_tvg_id(name): return re.sub(r'[^A-Za-z0-9_]', '_', name.strip())
 
@@ -163,77 +191,62 @@ def language_to_group(language: str | None) -> str:
 
     return mapping.get(key, groups["other"])
 
-# --- NEW HELPER FUNCTION ---
-def get_movie_sort_key(x: Item):
-    """
-    Generates a sort key for movies:
-    1. Recent items (group 0) vs. Non-recent (group 1)
-    2. Recent items are sorted by added_dt descending.
-       - Achieved by sorting (MAX_DATE - added_dt) ascending.
-       - None/missing dates are treated as oldest (datetime.min), sorting them last.
-    3. Non-recent items are sorted by year descending (-x.year).
-    4. Tie-breaker is name ascending.
-    """
-    if x.recent:
-        # Group 0: Recent
-        # Use min datetime for None to sort them last (largest time delta)
-        added_dt_safe = x.added_dt if x.added_dt else datetime.min.replace(tzinfo=timezone.utc)
-        # Sort by (MAX_DATE - added_dt) ascending, which is date descending
-        # Use total_seconds() for a simple sortable number
-        sort_key = (datetime.max.replace(tzinfo=timezone.utc) - added_dt_safe).total_seconds()
-        return (0, sort_key, x.name.lower())
-    else:
-        # Group 1: Non-recent
-        # Sort by year descending
-        sort_key = -x.year
-        return (1, sort_key, x.name.lower())
+# Group sort keys, precomputed on Item (see models.Item.__post_init__)
+by_movie_order = attrgetter("sort_key")  # recent by added desc, then year desc, then name
+by_name_key = attrgetter("name_key")
 
 # ---------- parsers
 
+def _decode_entries(data: dict, model, path: str):
+    """(name, record) pairs; entries that don't match the schema are reported and skipped."""
+    for name, raw in data.items():
+        try:
+            yield name, model.from_dict(raw, name)
+        except SchemaError as e:
+            print(f"⚠️  {path}: skipping {e}")
+
 def parse_m3u(path: str) -> list[Item]:
     out = []
     try:
-        with open(path, encoding="utf-8", errors="ignore") as f:
-            lines = [ln.strip() for ln in f]
+        f = open(path, encoding="utf-8", errors="ignore")
     except FileNotFoundError:
         print(f"⚠️  {path} not found. Skipping.")
         return out
 
-    header = link = group = tvg_id = tvg_logo = None
-    for ln in lines:
-        if ln.startswith("#EXTINF"):
-            header = ln
-            group = (re.search(r'group-title="([^"]+)"', ln) or [None,"Other"])[1]
-            tvg_id = (re.search(r'tvg-id="([^"]*)"', ln) or [None,None])[1]
-            tvg_logo = (re.search(r'tvg-logo="([^"]*)"', ln) or [None,None])[1]
-        elif ln and not ln.startswith("#"):
-            link = ln
-            if header and link:
-                name = channel_display_name(header)
-                out.append(Item(header, link, group, tvg_id, tvg_logo, False, name=name, source_rank=3))
-            header = link = None
+    extinf = None  # (duration, attrs, title) of the pending #EXTINF line
+    with f:
+        for ln in f:
+            ln = ln.strip()
+            if ln.startswith("#EXTINF"):
+                extinf = parse_extinf(ln)
+            elif ln and not ln.startswith("#"):
+                if extinf:
+                    duration, attrs, name = extinf
+                    out.append(Item(
+                        attrs, ln, attrs.get("group-title") or "Other", attrs.get("tvg-id"), attrs.get("tvg-logo"),
+                        False, name=name, source_rank=3, duration=duration,
+                    ))
+                extinf = None
     return out
 
 def parse_json_channels(path: str) -> list[Item]:
     out = []
     try:
         with open(path, encoding="utf-8") as f:
-            data = json.load(f)
+            data = json_fast.load(f)
     except FileNotFoundError:
         print(f"⚠️  {path} not found. Skipping.")
         return out
-    for name, info in data.items():
-        group = info.get("group", "Other")
-        tvg_id = info.get("tvg_id") or generate_tvg_id(name)
-        tvg_logo = info.get("tvg_logo")
-        links = info.get("links", [])
-        online = next((l["url"] for l in links if l.get("status") == "online"), None)
+    for name, info in _decode_entries(data, Channel, path):
+        group = info.group or "Other"
+        tvg_id = info.tvg_id or generate_tvg_id(name)
+        tvg_logo = info.tvg_logo
+        online = next((l.url for l in info.links if l.status == "online"), None)
         if online:
-            header = f'#EXTINF:-1 group-title="{group}",{name}'
-            out.append(Item(header, online, group, tvg_id, tvg_logo, False, name=name, source_rank=2))
+            out.append(Item({"group-title": group}, online, group, tvg_id, tvg_logo, False, name=name, source_rank=2))
     return out
 
-def parse_movies_json(path: str) -> list[Item]:
+def parse_movies_json(path: str, now: datetime) -> list[Item]:
     """
     static_movies.json: same shape as ctgfun but may include 'status'.
     - choose_best_link() handles 'status' if present
@@ -243,44 +256,38 @@ def parse_movies_json(path: str) -> list[Item]:
     out = []
     try:
         with open(path, encoding="utf-8") as f:
-            data = json.load(f)
+            data = json_fast.load(f)
     except FileNotFoundError:
         print(f"⚠️  {path} not found. Skipping.")
         return out
 
-    for title, info in data.items():
-        year = normalize_year(info.get("year"))
-        tvg_logo = info.get("tvg_logo")
+    for title, info in _decode_entries(data, Movie, path):
+        year = normalize_year(info.year)
+        tvg_logo = info.tvg_logo
         tvg_id = generate_tvg_id(title)
-        links = info.get("links", [])
 
-        chosen = choose_best_link(links)
+        chosen = choose_best_link(info.links)
         if not chosen:
             continue
 
-        link = chosen["url"]
-        group = language_to_group(chosen.get("language"))
+        link = chosen.url
+        group = language_to_group(chosen.language)
 
-        # --- MODIFICATION START ---
-        added_dt = parse_iso_utc(chosen.get("added")) # Parse once
-        recent = False
-        if added_dt:
-            recent = (datetime.now(timezone.utc) - added_dt) <= timedelta(days=RECENT_DAYS)
-        # --- MODIFICATION END ---
+        added_dt = parse_iso_utc(chosen.added)
+        recent = is_recent_dt(added_dt, now)
 
         base_name = f"{title} ({year})" if year != -1 else title
         name = base_name + RECENT_TAG if recent else base_name
 
-        header = f'#EXTINF:-1 group-title="{group}",{name}'
         out.append(Item(
-            header, link, group, tvg_id, tvg_logo, True,
+            {"group-title": group}, link, group, tvg_id, tvg_logo, True,
             year=year, name=name, recent=recent,
             added_dt=added_dt,  # <-- PASS THE PARSED DATE
             source_rank=1
         ))
     return out
 
-def choose_best_link(links: list[dict]) -> dict | None:
+def choose_best_link(links: list[MovieLink]) -> MovieLink | None:
     """
     Prefer the first link that is explicitly online (if 'status' is present),
     otherwise fall back to the first link that simply has a URL.
@@ -288,65 +295,85 @@ def choose_best_link(links: list[dict]) -> dict | None:
     """
     if not links:
         return None
-    online = next((l for l in links if l.get("url") and l.get("status") == "online"), None)
+    online = next((l for l in links if l.url and l.status == "online"), None)
     if online:
         return online
-    return next((l for l in links if l.get("url")), None)
+    return next((l for l in links if l.url), None)
 
 # ---------- NEW: ctgfun/cinehub consolidation (latest link wins)
 
-def _choose_latest_link_by_added(links: list[dict]) -> dict | None:
+def _choose_latest_link_by_added(links: list[MovieLink]) -> tuple[MovieLink, datetime | None] | None:
     """
     For ctgfun-like sources (no status), choose the link with the most recent 'added' timestamp.
     If none have a parseable 'added', fall back to the first link with a URL.
+    Returns (link, parsed added) so callers don't parse the date again.
     """
     if not links:
         return None
-    with_url = [l for l in links if l.get("url")]
+    with_url = [l for l in links if l.url]
     if not with_url:
         return None
-    dated = [(parse_iso_utc(l.get("added")), l) for l in with_url]
+    dated = [(parse_iso_utc(l.added), l) for l in with_url]
     valid = [pair for pair in dated if pair[0] is not None]
     if valid:
         # newest by datetime
-        return max(valid, key=lambda x: x[0])[1]
-    return with_url[0]
+        added_dt, link = max(valid, key=lambda x: x[0])
+        return link, added_dt
+    return with_url[0], None
 
-def parse_ctg_style_movies_json(paths: list[str]) -> list[Item]:
+def load_ctg_style_file(path: str) -> tuple[set, list[tuple]] | None:
+    """
+    Heavy half of the ctg-style consolidation for ONE file (safe to run in a worker):
+    returns (titles, candidates) with one (key, title, year, tvg_logo, chosen_link,
+    added_dt, language) per title in file order, or None if the file is missing.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json_fast.load(f)
+    except FileNotFoundError:
+        return None
+
+    candidates = []
+    for title, info in _decode_entries(data, Movie, path):
+        picked = _choose_latest_link_by_added(info.links)
+        if not picked:
+            continue
+        chosen, added_dt = picked
+        candidates.append((
+            title.lower(), title, normalize_year(info.year), info.tvg_logo,
+            chosen, added_dt, chosen.language,
+        ))
+    return set(data.keys()), candidates
+
+def parse_ctg_style_movies_json(paths: list[str], now: datetime) -> list[Item]:
     """
     Load multiple ctgfun-like movie JSON files and consolidate by title.
     If a title exists in multiple files, pick the link with the latest 'added' timestamp across files.
     Prints overlap and winning-source counts.
     """
+    return merge_ctg_style_movies(paths, [load_ctg_style_file(p) for p in paths], now)
+
+def merge_ctg_style_movies(paths: list[str], loaded: list[tuple[set, list[tuple]] | None],
+                           now: datetime) -> list[Item]:
+    """
+    Serial half of parse_ctg_style_movies_json(): fold the per-file candidates from
+    load_ctg_style_file() in path order, so the winners never depend on load timing.
+    """
     best_by_title: dict[str, dict] = {}  # title_lower -> {year, tvg_logo, link, added_dt, language, origin, title_orig}
     titles_per_source: dict[str, set] = {}
     recent_count = 0
 
     print("🎬 Consolidating ctg-style movie sources")
-    for path in paths:
-        try:
-            with open(path, encoding="utf-8") as f:
-                data = json.load(f)
-            titles = set(data.keys())
-            titles_per_source[path] = titles
-            kv("Loaded", f"{len(titles)} titles from {path}", "📥")
-        except FileNotFoundError:
+    for path, result in zip(paths, loaded):
+        if result is None:
             print(f"⚠️  {path} not found. Skipping.")
             titles_per_source[path] = set()
             continue
+        titles, candidates = result
+        titles_per_source[path] = titles
+        kv("Loaded", f"{len(titles)} titles from {path}", "📥")
 
-        for title, info in data.items():
-            key = title.lower() # <-- MODIFICATION: Use lowercase key for lookup
-            year = normalize_year(info.get("year"))
-            tvg_logo = info.get("tvg_logo")
-            links = info.get("links", [])
-
-            chosen = _choose_latest_link_by_added(links)
-            if not chosen:
-                continue
-
-            cand_added_dt = parse_iso_utc(chosen.get("added"))
-            cand_language = chosen.get("language")
+        for key, title, year, tvg_logo, chosen, cand_added_dt, cand_language in candidates:
             record = best_by_title.get(key) # <-- MODIFICATION: Get by lowercase key
 
             if (record is None) or (cand_added_dt and (record["added_dt"] is None or cand_added_dt > record["added_dt"])):
@@ -371,11 +398,9 @@ def parse_ctg_style_movies_json(paths: list[str]) -> list[Item]:
     winners = Counter()
     for rec in best_by_title.values():
         winners[rec["origin"]] += 1
-        
-        # --- MODIFIED: Use the parsed added_dt for recent check ---
-        if rec["added_dt"] and (datetime.now(timezone.utc) - rec["added_dt"]) <= timedelta(days=RECENT_DAYS):
-            recent_count += 1
-            
+        rec["recent"] = is_recent_dt(rec["added_dt"], now)  # decided once, reused when emitting
+        recent_count += rec["recent"]
+
     if winners:
         detail = ", ".join([f"{os.path.basename(src)}: {cnt}" for src, cnt in winners.items()])
         print(f"🏁 Winning source counts (ctg-style): {detail}")
@@ -389,22 +414,17 @@ def parse_ctg_style_movies_json(paths: list[str]) -> list[Item]:
         tvg_logo = rec["tvg_logo"]
         tvg_id = generate_tvg_id(title)
         chosen = rec["link"]
-        link = chosen["url"]
+        link = chosen.url
         group = language_to_group(rec["language"])
 
-        # --- MODIFICATION START ---
-        added_dt = rec["added_dt"] # Get the stored datetime object
-        recent = False
-        if added_dt:
-            recent = (datetime.now(timezone.utc) - added_dt) <= timedelta(days=RECENT_DAYS)
-        # --- MODIFICATION END ---
+        added_dt = rec["added_dt"]
+        recent = rec["recent"]
 
         base_name = f"{title} ({year})" if year != -1 else title
         name = base_name + RECENT_TAG if recent else base_name
 
-        header = f'#EXTINF:-1 group-title="{group}",{name}'
         out.append(Item(
-            header, link, group, tvg_id, tvg_logo, True,
+            {"group-title": group}, link, group, tvg_id, tvg_logo, True,
             year=year, name=name, recent=recent,
             added_dt=added_dt,  # <-- PASS THE PARSED DATE
             source_rank=0
@@ -414,42 +434,100 @@ def parse_ctg_style_movies_json(paths: list[str]) -> list[Item]:
     return out
 # ---------- output
 
-def save_m3u(items: list[Item], output_file: str):
+def _m3u_entry(it: Item) -> str:
+    # Existing keys keep their position, new ones are appended
+    attrs = dict(it.attrs)
+    if it.tvg_id:
+        attrs["tvg-id"] = it.tvg_id
+    if it.tvg_logo:
+        attrs["tvg-logo"] = it.tvg_logo
+    return f"{format_extinf(attrs, it.name, it.duration)}\n{it.link}\n"
+
+def save_m3u(groups: Iterable[Iterable[Item]], output_file: str, compress: bool = COMPRESS_OUTPUT) -> int:
+    """
+    Stream the playlist one group at a time through large write buffers. Each group is
+    encoded once and the same bytes feed output_file and, with `compress`, its .gz/.br
+    copies (deterministic: no timestamp in the gzip header). Returns the items written.
+    """
     _EPG_URL = "https://raw.githubusercontent.com/time2shine/IPTV/refs/heads/master/epg.xml"
-    with open(output_file, "w", encoding="utf-8") as f:
+    with ExitStack() as stack:
+        sinks = [stack.enter_context(open(output_file, "wb", buffering=WRITE_BUFFER)).write]
+        if compress:
+            gz_raw = stack.enter_context(open(output_file + ".gz", "wb", buffering=WRITE_BUFFER))
+            gz = stack.enter_context(gzip.GzipFile(filename="", mode="wb", fileobj=gz_raw, compresslevel=9, mtime=0))
+            sinks.append(gz.write)
+            if brotli is not None:
+                br_raw = stack.enter_context(open(output_file + ".br", "wb", buffering=WRITE_BUFFER))
+                br = brotli.Compressor(quality=BROTLI_QUALITY)
+                sinks.append(lambda data: br_raw.write(br.process(data)))
+                stack.callback(lambda: br_raw.write(br.finish()))  # runs before br_raw closes
+
+        def emit(text: str):
+            data = text.encode("utf-8")
+            for write in sinks:
+                write(data)
+
         header_attrs = f'url-tvg="{_EPG_URL}" x-tvg-url="{_EPG_URL}"' if _EPG_URL else ""
-        f.write(f"#EXTM3U {header_attrs}\n")
-        for it in items:
-            base, name = it.header.split(",", 1)[0], it.name
-            if it.tvg_id:
-                base = re.sub(r'tvg-id="[^"]*"', f'tvg-id="{it.tvg_id}"', base) if 'tvg-id="' in base else f'{base} tvg-id="{it.tvg_id}"'
-            if it.tvg_logo:
-                base = re.sub(r'tvg-logo="[^"]*"', f'tvg-logo="{it.tvg_logo}"', base) if 'tvg-logo="' in base else f'{base} tvg-logo="{it.tvg_logo}"'
-            f.write(f"{base},{name}\n{it.link}\n")
+        emit(f"#EXTM3U {header_attrs}\n")
+        count = 0
+        for group in groups:
+            chunk = [_m3u_entry(it) for it in group]
+            if chunk:
+                emit("".join(chunk))
+                count += len(chunk)
+    return count
 
 # ---------- main
 
+class _InlineExecutor:
+    """Executor stand-in that runs each call at submit time (LOADER_WORKERS <= 1)."""
+
+    def submit(self, fn, *args) -> Future:
+        fut = Future()
+        try:
+            fut.set_result(fn(*args))
+        except BaseException as e:
+            fut.set_exception(e)
+        return fut
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+def loader_pool():
+    return ProcessPoolExecutor(max_workers=LOADER_WORKERS) if LOADER_WORKERS > 1 else _InlineExecutor()
+
 def main():
     start = time.time()
+    now = datetime.now(timezone.utc)  # one clock for every "recent" decision in this run
     banner("🎛️  IPTV Playlist Builder")
 
-    # Load sources
+    # Load sources: every file in parallel, results consumed in the fixed order below
     print("📂 Reading sources…")
-    yt = parse_m3u(YT_FILE)
-    kv("M3U channels", str(len(yt)), "📼")
-
-    chans = parse_json_channels(JSON_FILE)
-    kv("Static channels (online)", str(len(chans)), "📡")
-
-    movies = parse_movies_json(MOVIES_FILE)
-    kv("static_movies.json (online)", str(len(movies)), "🎞️")
-
-    # Consolidate ctgfun + cinehub24 (latest link wins per title)
-    ctg_like = parse_ctg_style_movies_json([
+    ctg_paths = [
         CTG_FUN_MOVIES_JSON,
         CINEHUB_MOVIES_JSON,
         Infobase_MOVIES_JSON,
-    ])
+    ]
+    with loader_pool() as pool:
+        yt_f = pool.submit(parse_m3u, YT_FILE)
+        chans_f = pool.submit(parse_json_channels, JSON_FILE)
+        movies_f = pool.submit(parse_movies_json, MOVIES_FILE, now)
+        ctg_fs = [pool.submit(load_ctg_style_file, p) for p in ctg_paths]
+
+        yt = yt_f.result()
+        kv("M3U channels", str(len(yt)), "📼")
+
+        chans = chans_f.result()
+        kv("Static channels (online)", str(len(chans)), "📡")
+
+        movies = movies_f.result()
+        kv("static_movies.json (online)", str(len(movies)), "🎞️")
+
+        # Consolidate ctgfun + cinehub24 (latest link wins per title)
+        ctg_like = merge_ctg_style_movies(ctg_paths, [f.result() for f in ctg_fs], now)
 
     # Combine & deduplicate
     print("\n🧩 Combining and de-duplicating…")
@@ -458,24 +536,14 @@ def main():
     by_name: dict[str, Item] = {}
     duplicates_removed = 0
     for it in combined:
-        # <-- MODIFICATION START
-        base_name = it.name or channel_display_name(it.header)
-        key = base_name.lower()
-        # <-- MODIFICATION END
-        
-        if key not in by_name:
-            by_name[key] = it
+        cur = by_name.get(it.name_key)
+        if cur is None:
+            by_name[it.name_key] = it
         else:
-            cur = by_name[key]
-            # Prefer lower source_rank, then has logo, then recent, then newer year
-            chosen = min(
-                (cur, it),
-                # Note: 'recent' and 'year' logic is for DE-DUPLICATION preference,
-                # not final sorting. This logic remains correct.
-                key=lambda x: (x.source_rank, 0 if x.tvg_logo else 1, 0 if x.recent else 1, -x.year)
-            )
-            if chosen is not cur:
-                by_name[key] = chosen
+            # Item.pref_key: lower source_rank, then has logo, then recent, then newer year;
+            # on a tie the first one seen stays
+            if it.pref_key < cur.pref_key:
+                by_name[it.name_key] = it
             duplicates_removed += 1
 
     if duplicates_removed:
@@ -490,20 +558,12 @@ def main():
 
     for g, lst in groups.items():
         is_movie_group = (g in MOVIE_GROUPS) or all(it.is_movie for it in lst)
-        
-        # --- MODIFICATION START ---
-        if is_movie_group:
-            lst.sort(key=get_movie_sort_key) # <-- USE THE NEW HELPER
-        else:
-            lst.sort(key=lambda x: x.name.lower())
-        # --- MODIFICATION END ---
-
-    # Group order
-    out = []
-    for g in GROUP_ORDER + sorted(k for k in groups.keys() if k not in GROUP_ORDER):
-        out.extend(groups.get(g, []))
+        # Keys are precomputed on each Item; one sort pass per group
+        lst.sort(key=by_movie_order if is_movie_group else by_name_key)
 
-    save_m3u(out, OUTPUT_FILE)
+    # Group order (streamed straight into the writer)
+    group_order = GROUP_ORDER + sorted(k for k in groups.keys() if k not in GROUP_ORDER)
+    written = save_m3u((groups.get(g, []) for g in group_order), OUTPUT_FILE)
 
     # ---------- Summary
     elapsed = time.time() - start
@@ -514,16 +574,16 @@ def main():
        f"M3U={len(yt)} • Channels={len(chans)} • static_movies={len(movies)} • ctg/cinehub={len(ctg_like)}",
        "🗂️")
 
-    kv("Output items", str(len(out)), "✅")
+    kv("Output items", str(written), "✅")
     kv("Duplicates removed", str(duplicates_removed), "🔁")
 
     # Per-group distribution
     print("🧭 Group distribution:")
-    for g in GROUP_ORDER + sorted(k for k in groups.keys() if k not in GROUP_ORDER):
+    for g in group_order:
         if g in groups:
             print(f"  - {g}: {len(groups[g])}")
 
-    kv("Saved as", OUTPUT_FILE, "💾")
+    kv("Saved as", OUTPUT_FILE + (" (+ .gz" + (", .br" if brotli else "") + ")" if COMPRESS_OUTPUT else ""), "💾")
     kv("Elapsed", f"{elapsed:.2f}s", "⏱")
     print("\n✨ Done. Enjoy!")
 
@@ -0,0 +1,91 @@
+"""
+HTML parsing backend for the EPG scrapers.
+
+    soup = epg_html.parse(response.text)
+    soup.select(...), soup.select_one(...), tag.get_text(strip=True), tag.get(attr), tag.extract()
+
+EPG_HTML_PARSER picks the backend:
+  - "selectolax" (default): lexbor via selectolax, wrapped to the BeautifulSoup subset
+    above; parse + CSS selection run in C
+  - "lxml": BeautifulSoup on the lxml tree builder (selectors stay in soupsieve)
+  - "html.parser": BeautifulSoup's pure-Python builder (the old behaviour)
+A backend whose package is not installed falls back to the next one in that order.
+scripts/bench_epg_html.py measures them on saved pages and checks they extract the
+same programmes; run it before relying on a speed-up for a site.
+"""
+import importlib.util
+import os
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+BACKENDS = ("selectolax", "lxml", "html.parser")
+
+
+def available(backend: str) -> bool:
+    if backend == "lxml":
+        return importlib.util.find_spec("lxml") is not None
+    if backend == "selectolax":
+        return LexborHTMLParser is not None
+    return backend == "html.parser"
+
+
+def resolve(backend: str) -> str:
+    """The requested backend if usable, else the first usable one after it."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EPG_HTML_PARSER {backend!r}; expected one of {', '.join(BACKENDS)}")
+    for name in BACKENDS[BACKENDS.index(backend):]:
+        if available(name):
+            return name
+    return "html.parser"
+
+
+PARSER = resolve(os.getenv("EPG_HTML_PARSER", "selectolax"))
+
+
+class Node:
+    """
+    BeautifulSoup-shaped view of a selectolax node: exactly the calls the scrapers
+    make (select, select_one, get_text, text, get, extract).
+    """
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    def select(self, selector):
+        return [Node(n) for n in self._node.css(selector)]
+
+    def select_one(self, selector):
+        n = self._node.css_first(selector)
+        return Node(n) if n is not None else None
+
+    def get_text(self, separator="", strip=False):
+        return self._node.text(deep=True, separator=separator, strip=strip)
+
+    @property
+    def text(self):
+        return self.get_text()
+
+    def get(self, attr, default=None):
+        value = self._node.attributes.get(attr, default)
+        return "" if value is None and attr in self._node.attributes else value
+
+    def extract(self):
+        self._node.decompose()
+        return self
+
+
+def parse(markup, backend=None):
+    """Parse a page with `backend` (default: PARSER)."""
+    backend = backend or PARSER
+    if backend == "selectolax":
+        tree = LexborHTMLParser(markup)
+        # BeautifulSoup's get_text() skips script/style strings; lexbor's text() does not
+        tree.strip_tags(["script", "style"])
+        return Node(tree)
+    return BeautifulSoup(markup, backend)
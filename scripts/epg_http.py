@@ -0,0 +1,113 @@
+"""
+Shared HTTP layer for the EPG scrapers.
+
+One pooled requests.Session for the whole run (keep-alive per host instead of a
+fresh TCP+TLS handshake per page), per-site request headers, retries with
+exponential backoff on transient failures, and a cap on concurrent requests per
+domain so the scraper thread pool never hammers a single site.
+
+    response = epg_http.get(url)   # raises like requests.get + raise_for_status()
+"""
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# -----------------------
+# Config
+# -----------------------
+TIMEOUT = 10                                              # seconds, connect and read
+PER_DOMAIN_LIMIT = int(os.getenv("EPG_PER_DOMAIN", "4"))  # requests in flight per domain
+POOL_HOSTS = 16                                           # hosts with a kept-alive pool
+RETRIES = 3                                               # retries after the first attempt
+BACKOFF = 0.5                                             # sleeps 0.5s, 1s, 2s between tries
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# Extra headers per site (matched on the registrable tail of the host name)
+SITE_HEADERS: Dict[str, Dict[str, str]] = {
+    "tvgenie.in": {"Accept-Language": "en-IN,en;q=0.9"},
+    "tvwish.com": {"Accept-Language": "en-IN,en;q=0.9"},
+    "tvpassport.com": {"Accept-Language": "en-US,en;q=0.9"},
+    "ontvtonight.com": {"Accept-Language": "en-US,en;q=0.9"},
+    "tvguide.co.uk": {"Accept-Language": "en-GB,en;q=0.9"},
+    "epg.pw": {"Accept-Language": "en"},
+}
+
+
+def _domain(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def headers_for(url: str) -> Dict[str, str]:
+    domain = _domain(url)
+    for site, extra in SITE_HEADERS.items():
+        if domain == site or domain.endswith("." + site):
+            return {**DEFAULT_HEADERS, **extra}
+    return dict(DEFAULT_HEADERS)
+
+
+# -----------------------
+# Session
+# -----------------------
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def session() -> requests.Session:
+    """Process-wide session shared by every scraper thread."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            s = requests.Session()
+            retry = Retry(
+                total=RETRIES,
+                backoff_factor=BACKOFF,
+                status_forcelist=RETRY_STATUS,
+                allowed_methods=frozenset({"GET", "HEAD"}),
+                respect_retry_after_header=True,
+                raise_on_status=False,  # the final response goes through raise_for_status()
+            )
+            adapter = HTTPAdapter(
+                pool_connections=POOL_HOSTS,
+                pool_maxsize=PER_DOMAIN_LIMIT,
+                max_retries=retry,
+            )
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _SESSION = s
+    return _SESSION
+
+
+# -----------------------
+# Per-domain cap
+# -----------------------
+_DOMAIN_SLOTS: Dict[str, threading.BoundedSemaphore] = {}
+_DOMAIN_LOCK = threading.Lock()
+
+
+@contextmanager
+def domain_slot(url: str):
+    """Hold one of the PER_DOMAIN_LIMIT slots of the url's domain."""
+    domain = _domain(url)
+    with _DOMAIN_LOCK:
+        sem = _DOMAIN_SLOTS.get(domain)
+        if sem is None:
+            sem = _DOMAIN_SLOTS[domain] = threading.BoundedSemaphore(max(1, PER_DOMAIN_LIMIT))
+    with sem:
+        yield
+
+
+def get(url: str, timeout: float = TIMEOUT) -> requests.Response:
+    """GET with the site's headers, retries and domain cap; raises on HTTP errors."""
+    with domain_slot(url):
+        response = session().get(url, headers=headers_for(url), timeout=timeout)
+    response.raise_for_status()
+    return response
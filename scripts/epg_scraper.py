@@ -1,13 +1,18 @@
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta, timezone
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
 import logging
 import html
-from playwright.sync_api import sync_playwright
+import os
+import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from playwright.async_api import async_playwright
 import pytz
 
+import epg_html
+import epg_http
+
 # -----------------------
 # Logging setup
 # -----------------------
@@ -16,19 +21,33 @@ logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
 
+# -----------------------
+# Concurrency
+# -----------------------
+HTTP_WORKERS = int(os.getenv("EPG_HTTP_WORKERS", "16"))  # plain-HTTP scrapers in flight
+TVWISH_PAGES = int(os.getenv("EPG_TVWISH_PAGES", "8"))   # concurrent tvwish pages, reused across channels
+TVWISH_TIMEOUT_MS = 10000                                # per navigation / schedule-item wait
+TVWISH_UPCOMING_SELECTOR = "#divUpcoming div.card.schedule-item"  # filled in by script
+
+# Requests the tvwish pages never need: aborted before they hit the network
+BLOCKED_RESOURCE_TYPES = {"image", "stylesheet", "font", "media"}
+BLOCKED_URL_PARTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googlesyndication.com", "adservice.google", "facebook.net", "scorecardresearch.com",
+)
+
 # -----------------------
 # Scrapers for tvgenie sites
 # -----------------------
 def scrape_tvgenie(channel_id, display_name, logo_url, url):
     logging.info(f"Fetching TV schedule from tvgenie for {display_name} ...")
     try:
-        response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-        response.raise_for_status()
+        response = epg_http.get(url)
     except Exception as e:
         logging.error(f"Failed to fetch {url}: {e}")
         return {"id": channel_id, "name": display_name, "logo": logo_url, "programmes": []}
 
-    soup = BeautifulSoup(response.text, "html.parser")
+    soup = epg_html.parse(response.text)
     programmes = []
 
     items = soup.select("div.requested-movies.card")
@@ -65,38 +84,79 @@ def scrape_tvgenie(channel_id, display_name, logo_url, url):
 # -----------------------
 # Scrapers for tvwish sites
 # -----------------------
-def scrape_tvwish(channel_id, display_name, logo_url, url, browser=None):
+async def _block_heavy(route):
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(p in request.url for p in BLOCKED_URL_PARTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+class PagePool:
+    """
+    A fixed set of pages in one browser context, handed out one channel at a time and
+    reused for the next. Images, CSS, fonts and trackers are aborted for every page.
+    """
+
+    def __init__(self, context, pages):
+        self._context = context
+        self._idle = asyncio.Queue()
+        for page in pages:
+            self._idle.put_nowait(page)
+
+    @classmethod
+    async def open(cls, browser, size):
+        context = await browser.new_context()
+        await context.route("**/*", _block_heavy)
+        pages = [await context.new_page() for _ in range(max(1, size))]
+        return cls(context, pages)
+
+    @contextlib.asynccontextmanager
+    async def page(self):
+        page = await self._idle.get()
+        try:
+            yield page
+        finally:
+            if page.is_closed():  # crashed tab: replace it so the pool keeps its size
+                page = await self._context.new_page()
+            self._idle.put_nowait(page)
+
+
+async def scrape_tvwish(channel_id, display_name, logo_url, url, pages):
     """
     Scrape TVWish schedule (Indian time) and convert to Bangladesh time.
+    `pages` is the PagePool shared by all tvwish channels of the run. Both the
+    upcoming shows and the current show come from the one rendered page.
     """
     logging.info(f"Fetching TV schedule from TVWish for {display_name} ...")
     programmes = []
     now = datetime.now()
+    soup = None
 
     # -------------------
     # Upcoming shows (JS rendered)
     # -------------------
     try:
-        if browser is None:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                programmes += _fetch_upcoming_tvwish(browser, url, now)
-                browser.close()
-        else:
-            programmes += _fetch_upcoming_tvwish(browser, url, now)
+        soup = epg_html.parse(await _render_tvwish(pages, url))
+        programmes += _parse_upcoming_tvwish(soup, now)
     except Exception as e:
         logging.error(f"Failed to fetch upcoming shows: {e}")
 
+    # The current show is only placed relative to the first upcoming one
+    if not programmes:
+        return {"id": channel_id, "name": display_name, "logo": logo_url, "programmes": programmes}
+
     # -------------------
-    # Current show (HTML)
+    # Current show (same DOM; plain HTTP only if the rendered page lacks it)
     # -------------------
     try:
-        response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-
         current_show = soup.select_one("div.prog-list")
-        if current_show and programmes:
+        if current_show is None:
+            logging.info(f"No current show in rendered page for {display_name}, fetching HTML")
+            response = await asyncio.to_thread(epg_http.get, url)
+            current_show = epg_html.parse(response.text).select_one("div.prog-list")
+
+        if current_show:
             title_tag = current_show.select_one("h4")
             if title_tag:
                 title = html.escape(title_tag.get_text(strip=True))
@@ -113,17 +173,22 @@ def scrape_tvwish(channel_id, display_name, logo_url, url, browser=None):
     return {"id": channel_id, "name": display_name, "logo": logo_url, "programmes": programmes}
 
 
-def _fetch_upcoming_tvwish(browser, url, now):
+async def _render_tvwish(pages, url):
+    """Rendered HTML of a TVWish schedule page, once the upcoming shows are in the DOM."""
+    async with pages.page() as page:
+        # The schedule is injected by script: no need to wait for the full "load" event,
+        # but #divUpcoming may be served empty, so wait for the items _parse_upcoming_tvwish reads
+        await page.goto(url, wait_until="domcontentloaded", timeout=TVWISH_TIMEOUT_MS)
+        await page.wait_for_selector(TVWISH_UPCOMING_SELECTOR, state="attached", timeout=TVWISH_TIMEOUT_MS)
+        return await page.content()
+
+
+def _parse_upcoming_tvwish(soup, now):
     """
-    Fetch upcoming shows from TVWish and shift Indian time to Bangladesh time.
+    Upcoming shows from a rendered TVWish page, shifted from Indian to Bangladesh time.
     """
     programmes = []
-    page = browser.new_page()
-    page.goto(url)
-    page.wait_for_selector("#divUpcoming", timeout=10000)
-
-    soup = BeautifulSoup(page.content(), "html.parser")
-    upcoming_items = soup.select("#divUpcoming div.card.schedule-item")
+    upcoming_items = soup.select(TVWISH_UPCOMING_SELECTOR)
 
     for item in upcoming_items:
         title_tag = item.select_one("h4.text-warning")
@@ -149,7 +214,6 @@ def _fetch_upcoming_tvwish(browser, url, now):
         programmes.append({"title": title, "start": start, "stop": stop})
 
     logging.info(f"Fetched {len(upcoming_items)} upcoming shows via Playwright")
-    page.close()
     return programmes
 
 # -----------------------
@@ -160,24 +224,22 @@ def scrape_ontvtonight(channel_id, display_name, logo_url, url):
     programmes = []
 
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+        response = epg_http.get(url)
+        soup = epg_html.parse(response.text)
 
-        table = soup.find("table", class_="table table-hover")
+        table = soup.select_one('table[class="table table-hover"]')
         if not table:
             logging.warning("No schedule table found.")
             return {"id": channel_id, "name": display_name, "logo": logo_url, "programmes": programmes}
 
-        rows = table.find_all("tr")
+        rows = table.select("tr")
         epg_list = []
 
         for row in rows:
-            cols = row.find_all("td")
+            cols = row.select("td")
             if len(cols) >= 2:
                 time_str = cols[0].get_text(strip=True)
-                title_el = cols[1].find("a") or cols[1]
+                title_el = cols[1].select_one("a") or cols[1]
                 title = html.escape(title_el.get_text(strip=True))
 
                 try:
@@ -232,10 +294,8 @@ def scrape_epgpw(channel_id, display_name, logo_url, url):
     programmes = []
 
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+        response = epg_http.get(url)
+        soup = epg_html.parse(response.text)
 
         # Get Asia/Dhaka timezone
         tz = pytz.timezone("Asia/Dhaka")
@@ -310,10 +370,8 @@ def scrape_tvpassport(channel_id, display_name, logo_url, url):
     programmes = []
 
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+        response = epg_http.get(url)
+        soup = epg_html.parse(response.text)
 
         # Select all program items
         items = soup.select(".list-group-item")
@@ -368,10 +426,8 @@ def scrape_tvguide(channel_id, display_name, logo_url, url):
     programmes = []
 
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+        response = epg_http.get(url)
+        soup = epg_html.parse(response.text)
 
         tz = pytz.timezone("Asia/Dhaka")
         now = datetime.now(tz)
@@ -956,20 +1012,80 @@ def build_epg(channels_data, filename="epg.xml"):
 
 
 # -----------------------
-# Main
+# Concurrent driver
 # -----------------------
-if __name__ == "__main__":
-    all_channels = []
+def _scrape_channel(channel_id, display_name, logo_url, url, scraper_func, **kwargs):
+    """Run one scraper; a crash costs that channel its programmes, not the whole run."""
+    try:
+        return scraper_func(channel_id, display_name, logo_url, url, **kwargs)
+    except Exception as e:
+        logging.error(f"{scraper_func.__name__} failed for {display_name}: {e}")
+        return {"id": channel_id, "name": display_name, "logo": logo_url, "programmes": []}
+
+
+async def _scrape_tvwish_all(jobs):
+    """
+    Run every tvwish job on one browser through a PagePool of TVWISH_PAGES pages.
+    jobs: [(index, (channel_id, display_name, logo_url, url)), ...] → {index: channel}
+    """
+    async def one(idx, args):
+        try:
+            return idx, await scrape_tvwish(*args, pages=pages)
+        except Exception as e:
+            logging.error(f"scrape_tvwish failed for {args[1]}: {e}")
+            return idx, None
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            pages = await PagePool.open(browser, min(TVWISH_PAGES, len(jobs)))
+            return dict(await asyncio.gather(*(one(idx, args) for idx, args in jobs)))
+        finally:
+            await browser.close()
+
+
+def scrape_all(channels):
+    """
+    Scrape every channel concurrently: HTTP scrapers on a thread pool while the tvwish
+    pages run on an asyncio loop in this thread. Results are returned in `channels`
+    order so epg.xml does not depend on which request finished first.
+    """
+    entries = list(channels.items())
+    results = [None] * len(entries)
+    tvwish_jobs = []
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        for ch_id, (name, logo, url, scraper_func) in CHANNELS.items():
+    with ThreadPoolExecutor(max_workers=max(1, HTTP_WORKERS)) as http_pool:
+        http_futures = {}
+        for idx, (ch_id, (name, logo, url, scraper_func)) in enumerate(entries):
             if scraper_func == scrape_tvwish:
-                ch_data = scraper_func(ch_id, name, logo, url, browser=browser)
+                tvwish_jobs.append((idx, (ch_id, name, logo, url)))
             else:
-                ch_data = scraper_func(ch_id, name, logo, url)
-            all_channels.append(ch_data)
-        browser.close()
+                fut = http_pool.submit(_scrape_channel, ch_id, name, logo, url, scraper_func)
+                http_futures[fut] = idx
+
+        if tvwish_jobs:
+            try:
+                for idx, ch_data in asyncio.run(_scrape_tvwish_all(tvwish_jobs)).items():
+                    results[idx] = ch_data
+            except Exception as e:
+                logging.error(f"TVWish browser failed: {e}")
+
+        for fut, idx in http_futures.items():
+            results[idx] = fut.result()
+
+    # Channels whose scrape never completed still get their <channel> entry
+    for idx, (ch_id, (name, logo, _url, _func)) in enumerate(entries):
+        if results[idx] is None:
+            results[idx] = {"id": ch_id, "name": name, "logo": logo, "programmes": []}
+    return results
+
+
+# -----------------------
+# Main
+# -----------------------
+if __name__ == "__main__":
+    logging.info(f"HTML parser: {epg_html.PARSER}")
+    all_channels = scrape_all(CHANNELS)
 
     # Add the fixed YouTube channel (4-hour repeating block, today + tomorrow)
     all_channels.append(
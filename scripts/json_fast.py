@@ -0,0 +1,85 @@
+"""
+Drop-in JSON layer for the scripts: orjson when installed, msgspec for decoding
+when only it is available, stdlib json otherwise.
+
+Output contract (identical bytes whatever the backend, so git diffs stay stable):
+  - dict key order preserved, non-ASCII written as UTF-8 (ensure_ascii=False)
+  - indent=2  → same layout as json.dumps(..., ensure_ascii=False, indent=2)
+  - indent=None → compact "," / ":" separators (machine files such as journals)
+Anything orjson refuses (non-str keys, ints beyond 64 bits, ...) or would spell
+differently (NaN/Infinity, floats that repr() writes in exponent form) is encoded
+by the stdlib instead.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+JSONDecodeError = json.JSONDecodeError
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"  # decode only; encoding stays on the stdlib (no indent support)
+else:
+    BACKEND = "json"
+
+_msgspec_decoder = msgspec.json.Decoder() if msgspec is not None else None
+
+
+def loads(data):
+    """Parse str/bytes. Raises JSONDecodeError (a ValueError) on malformed input."""
+    if orjson is not None:
+        return orjson.loads(data)  # orjson.JSONDecodeError subclasses json.JSONDecodeError
+    if _msgspec_decoder is not None:
+        try:
+            return _msgspec_decoder.decode(data.encode("utf-8") if isinstance(data, str) else data)
+        except msgspec.DecodeError as e:
+            raise JSONDecodeError(str(e), data if isinstance(data, str) else "", 0) from None
+    return json.loads(data)
+
+
+def load(fp):
+    return loads(fp.read())
+
+
+def _stdlib_dumps(obj, indent) -> str:
+    if indent is None:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(obj, ensure_ascii=False, indent=indent)
+
+
+def _same_floats(obj) -> bool:
+    """True if every float in obj is spelled the same by orjson and repr()."""
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        t = type(o)
+        if t is dict:
+            stack.extend(o.values())
+        elif t is list or t is tuple:
+            stack.extend(o)
+        elif t is float and (o != o or (o and not 1e-4 <= abs(o) < 1e16)):
+            return False
+    return True
+
+
+def dumps(obj, indent=None) -> str:
+    """Serialize to str; `indent` may be None or 2 (the only layouts the scripts write)."""
+    if orjson is not None and indent in (None, 2) and _same_floats(obj):
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+        except (TypeError, orjson.JSONEncodeError):
+            pass
+    return _stdlib_dumps(obj, indent)
+
+
+def dump(obj, fp, indent=None) -> None:
+    fp.write(dumps(obj, indent=indent))
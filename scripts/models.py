@@ -0,0 +1,281 @@
+"""
+Typed records shared by the scripts.
+
+Channel / Link mirror static_channels.json, Movie / MovieLink the movie JSON files
+(static_movies.json and the ctg-style sources), Item is one combined.m3u entry.
+
+The JSON records are slotted classes decoded once at load time: known keys become
+attributes, unknown keys (note, quality, source, headers, ...) are carried verbatim
+in `extra`. A known key with an unexpected type (a hand-edited "speed": "1.0",
+"year": 2020.0, "added": 20240101) does not reject the entry: the attribute gets
+the value coerced to the field's type, or None if it has no sensible reading, and
+the original is written back until the run assigns that field. SchemaError (naming
+the offending path) is left for entries that are not objects at all. to_dict()
+writes keys in their original order and appends keys first set during the run,
+exactly like mutating the old dicts did, so untouched files round-trip byte for byte.
+"""
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+_NUMBER = (int, float)
+
+
+class SchemaError(ValueError):
+    """A JSON entry does not match the expected shape."""
+
+
+def _coerce(value: Any, allowed: tuple) -> Any:
+    """`value` as one of the `allowed` types, or None when it has no sensible reading."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and float in allowed:
+        try:
+            number = float(value.strip())
+        except ValueError:
+            return None
+        return number if math.isfinite(number) else None
+    if isinstance(value, float) and int in allowed and value.is_integer():
+        return int(value)
+    if isinstance(value, _NUMBER) and str in allowed:
+        return str(value)
+    return None
+
+
+class Record:
+    FIELDS: Tuple[str, ...] = ()
+    TYPES: Dict[str, tuple] = {}       # allowed types per field; None is always allowed
+    _FIELD_SET: frozenset = frozenset()
+    __slots__ = ("extra", "_keys", "_raw")
+
+    def __init_subclass__(cls, **kw):
+        super().__init_subclass__(**kw)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    def __init__(self, **values):
+        self._reset()
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def _reset(self) -> None:
+        object.__setattr__(self, "_keys", {})   # insertion-ordered set of present keys
+        object.__setattr__(self, "extra", {})
+        object.__setattr__(self, "_raw", {})    # field → original value that failed its type
+        for name in self.FIELDS:
+            object.__setattr__(self, name, None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        if name in self._FIELD_SET:
+            self._keys[name] = None
+            self._raw.pop(name, None)
+
+    def __contains__(self, name: str) -> bool:
+        """True if the key is present (possibly null), as `name in dict` was."""
+        return name in self._keys
+
+    def discard(self, name: str) -> None:
+        """Remove a key entirely (dict.pop), not just null it."""
+        object.__setattr__(self, name, None)
+        self._keys.pop(name, None)
+        self._raw.pop(name, None)
+
+    def __reduce__(self):
+        # Pickle (process pools) through the JSON form: keeps key order and extras
+        return type(self).from_dict, (self.to_dict(),)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    @classmethod
+    def from_dict(cls, data: Any, path: str = ""):
+        if not isinstance(data, dict):
+            raise SchemaError(f"{path or cls.__name__}: expected an object, got {type(data).__name__}")
+        rec = cls.__new__(cls)
+        rec._reset()
+        keys, extra, raw, types = rec._keys, rec.extra, rec._raw, cls.TYPES
+        for key, value in data.items():
+            if key in cls._FIELD_SET:
+                allowed = types.get(key)
+                if value is not None and allowed and (not isinstance(value, allowed) or value is True or value is False):
+                    raw[key] = value
+                    value = _coerce(value, allowed)
+                object.__setattr__(rec, key, value)
+            else:
+                extra[key] = value
+            keys[key] = None
+        return rec
+
+    def to_dict(self) -> Dict[str, Any]:
+        fields, extra, raw = self._FIELD_SET, self.extra, self._raw
+        return {k: (raw[k] if k in raw else getattr(self, k)) if k in fields else extra[k] for k in self._keys}
+
+
+# -----------------------------------------------------------------------------
+# static_channels.json
+# -----------------------------------------------------------------------------
+
+class Link(Record):
+    FIELDS = (
+        "url", "status", "first_online", "last_offline", "last_online",
+        "probe_time_s", "speed", "passed_via",
+        "ttff_s", "realtime_speed", "bitrate_kbps", "resolution",
+    )
+    TYPES = {
+        "url": (str,), "status": (str,), "passed_via": (str,), "resolution": (str,),
+        "first_online": (str,), "last_offline": (str,), "last_online": (str,),
+        "probe_time_s": _NUMBER, "speed": _NUMBER, "ttff_s": _NUMBER,
+        "realtime_speed": _NUMBER, "bitrate_kbps": _NUMBER,
+    }
+    __slots__ = FIELDS
+
+    @classmethod
+    def coerce(cls, raw: Any, path: str) -> "Link":
+        """
+        A "links" element as found in the file: empty → missing placeholder, bare URL
+        string → unknown link, object → decoded; first_online/last_offline always present.
+        """
+        if not raw:
+            return cls(url=None, status="missing", first_online=None, last_offline=None)
+        if isinstance(raw, str):
+            return cls(url=raw, status="unknown", first_online=None, last_offline=None)
+        link = cls.from_dict(raw, path)
+        if "first_online" not in link:
+            link.first_online = None
+        if "last_offline" not in link:
+            link.last_offline = None
+        return link
+
+
+class Channel(Record):
+    FIELDS = ("group", "tvg_id", "tvg_logo", "links")
+    TYPES = {"group": (str,), "tvg_id": (str,), "tvg_logo": (str,)}
+    __slots__ = FIELDS
+
+    @classmethod
+    def from_dict(cls, data: Any, path: str = "") -> "Channel":
+        ch = super().from_dict(data, path)
+        raw = ch.links if isinstance(ch.links, list) else []
+        ch.links = [Link.coerce(item, f"{path}.links[{i}]") for i, item in enumerate(raw)]
+        return ch
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = super().to_dict()
+        out["links"] = [link.to_dict() for link in self.links]
+        return out
+
+
+def channels_from_json(data: Any) -> Dict[str, Channel]:
+    if not isinstance(data, dict):
+        raise SchemaError(f"top level: expected an object of channels, got {type(data).__name__}")
+    return {name: Channel.from_dict(info, name) for name, info in data.items()}
+
+
+def channels_to_json(channels: Dict[str, Channel]) -> Dict[str, Any]:
+    return {name: ch.to_dict() for name, ch in channels.items()}
+
+# -----------------------------------------------------------------------------
+# Movie JSON files
+# -----------------------------------------------------------------------------
+
+class MovieLink(Record):
+    FIELDS = ("url", "status", "added", "language")
+    TYPES = {"url": (str,), "status": (str,), "added": (str,), "language": (str,)}
+    __slots__ = FIELDS
+
+
+_NOT_A_LIST = object()
+
+
+class Movie(Record):
+    FIELDS = ("year", "tvg_logo", "links")
+    TYPES = {"year": (str, int), "tvg_logo": (str,)}
+    # Link entries the readers always skipped (non-objects, or a non-list "links"),
+    # kept verbatim so writing the file back leaves them where they were
+    __slots__ = FIELDS + ("_odd_links", "_links_value")
+
+    def _reset(self) -> None:
+        super()._reset()
+        object.__setattr__(self, "_odd_links", {})             # original index → raw entry
+        object.__setattr__(self, "_links_value", _NOT_A_LIST)  # "links" itself when not a list
+
+    @classmethod
+    def from_dict(cls, data: Any, path: str = "") -> "Movie":
+        movie = super().from_dict(data, path)
+        raw, links = movie.links, []
+        if isinstance(raw, list):
+            for i, item in enumerate(raw):
+                if isinstance(item, dict):
+                    links.append(MovieLink.from_dict(item, f"{path}.links[{i}]"))
+                else:
+                    movie._odd_links[i] = item
+        elif "links" in movie:
+            object.__setattr__(movie, "_links_value", raw)
+        object.__setattr__(movie, "links", links)
+        return movie
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = super().to_dict()
+        if "links" in self:
+            if self._links_value is not _NOT_A_LIST and not self.links:
+                out["links"] = self._links_value
+                return out
+            links = iter(self.links)
+            total = len(self.links) + len(self._odd_links)
+            out["links"] = [
+                self._odd_links[i] if i in self._odd_links else next(links).to_dict()
+                for i in range(total)
+            ]
+        return out
+
+
+def movies_from_json(data: Any) -> Dict[str, Movie]:
+    if not isinstance(data, dict):
+        raise SchemaError(f"top level: expected an object of movies, got {type(data).__name__}")
+    return {title: Movie.from_dict(info, title) for title, info in data.items()}
+
+
+def movies_to_json(movies: Dict[str, Movie]) -> Dict[str, Any]:
+    return {title: movie.to_dict() for title, movie in movies.items()}
+
+# -----------------------------------------------------------------------------
+# combined.m3u
+# -----------------------------------------------------------------------------
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US = timedelta(microseconds=1)
+_UNDATED = 1 << 62   # sorts after every real -microseconds value
+
+
+@dataclass(slots=True)
+class Item:
+    attrs: Dict[str, str]  # EXTINF key="value" pairs, in header order
+    link: str
+    group: str
+    tvg_id: Optional[str]
+    tvg_logo: Optional[str]
+    is_movie: bool
+    year: int = -1
+    name: str = ""
+    recent: bool = False
+    added_dt: Optional[datetime] = None
+    # lower is preferred (0 = ctgfun/cinehub json, 1 = movies json, 2 = yt/json, 3 = m3u)
+    source_rank: int = 99
+    duration: str = "-1"
+    # Derived once in __post_init__ (items are not mutated afterwards), all plain ints/str
+    name_key: str = field(init=False, repr=False, compare=False)
+    sort_key: Tuple[int, int, str] = field(init=False, repr=False, compare=False)
+    pref_key: Tuple[int, int, int, int] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.name_key = self.name.lower()
+        # Movie group order: recent first by added_dt descending (undated last),
+        # then the rest by year descending; name breaks ties
+        if self.recent:
+            added = -((self.added_dt - _EPOCH) // _US) if self.added_dt else _UNDATED
+            self.sort_key = (0, added, self.name_key)
+        else:
+            self.sort_key = (1, -self.year, self.name_key)
+        # De-duplication preference, lower wins: source_rank, has logo, recent, newer year
+        self.pref_key = (self.source_rank, 0 if self.tvg_logo else 1, 0 if self.recent else 1, -self.year)
@@ -1,14 +1,32 @@
-import json
+import json_fast
 import time
+import argparse
+import asyncio
 import requests
 import functools
 import subprocess
 import os, shutil
 import tempfile
-import random
-from datetime import datetime, date
-from typing import Tuple, Optional, Dict
-from concurrent.futures import ThreadPoolExecutor
+import threading
+import ipaddress
+import http.cookiejar
+import re
+import zlib
+from urllib.parse import urljoin, urlparse
+from pathlib import Path
+from dataclasses import dataclass
+from contextlib import contextmanager, asynccontextmanager
+from datetime import datetime, date, timezone, timedelta
+from typing import Tuple, Optional, Dict, List, NamedTuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+
+from models import Channel, Link, SchemaError, channels_from_json, channels_to_json
+
+try:
+    import aiohttp  # optional: only used by the asyncio probe engine
+except ImportError:
+    aiohttp = None
 
 # -----------------------------------------------------------------------------
 # Instant-flush prints
@@ -24,9 +42,61 @@ FAST_MODE = False               # True = faster/lighter FFmpeg probe
 MAX_WORKERS = 120
 JSON_FILE = "static_channels.json"
 
-# HTTP header probe
-HEAD_RETRIES = 3
+# Per-origin politeness: many channels share a few CDNs (*.amagi.tv, *.akamaized.net, ...)
+HOST_MAX_CONCURRENCY = 6        # links probed at once per origin
+HOST_RATE_PER_S = 3.0           # new link probes per second per origin (token bucket refill)
+HOST_BURST = 6                  # token bucket size
+GLOBAL_MAX_CONCURRENCY = 120    # ceiling on links in flight across all origins
+# Multi-tenant CDNs: every subdomain is a separate customer/origin, so limit per full hostname
+SHARED_CDN_DOMAINS = {
+    "amagi.tv", "cloudfront.net", "amazonaws.com", "wurl.tv", "wurl.com",
+    "akamaized.net", "akamaihd.net", "edgesuite.net", "fastly.net", "fastlylb.net",
+    "b-cdn.net", "llnwd.net", "cdn77.org", "azureedge.net",
+}
+
+# Probe result cache: links that passed a full probe within the TTL only get a
+# conditional pre-flight (If-None-Match / If-Modified-Since) on the next runs
+PROBE_CACHE_FILE = "probe_cache.json"
+PROBE_CACHE_TTL_H = 12
+
+# Checkpoint journal: one JSON line per finished link, replayed by `--resume`
+# after an interrupted run and removed once JSON_FILE is written
+PROBE_JOURNAL_FILE = "probe_checkpoint.jsonl"
+SHARD_FILE = "probe_shard_{i}of{n}.jsonl"   # `--shard i/N` output (journal format), read by `--merge`
+
+# Adaptive scheduler: probe order and frequency from each link's history
+SCHED_BASE_INTERVAL_H = 4       # orchestrator cadence; normal links are due every run
+SCHED_STABLE_INTERVAL_H = 12    # stable fast links are re-checked less often
+SCHED_STABLE_DAYS = 7           # "stable" = online for at least this many days ...
+SCHED_STABLE_MIN_SPEED = 0.5    # ... with a last ffmpeg probe at least this fast (hls has no speed)
+SCHED_MAX_BACKOFF_H = 48        # dead links back off exponentially up to this interval
+SCHED_SLACK_MIN = 30            # tolerance for cron drift when deciding "due"
+# Early exit (0 = off): probe each channel's links in order and stop full probing once
+# this many are online; the remaining links only get a pre-flight liveness mark
+EARLY_EXIT_HEALTHY = int(os.getenv("EARLY_EXIT_HEALTHY", "0"))
+# Per-run wall-clock budget (seconds, 0 = none); links not started in time keep their old status
+PROBE_TIME_BUDGET_S = int(os.getenv("PROBE_TIME_BUDGET_S", "0"))
+
+# Probe engine: "threads" (ThreadPoolExecutor) or "asyncio" (non-blocking HTTP + async subprocesses)
+PROBE_ENGINE = os.getenv("PROBE_ENGINE", "threads").lower()
+ASYNC_HTTP_CONCURRENCY = 200    # in-flight pre-flight GETs (asyncio engine)
+ASYNC_PROC_CONCURRENCY = 24     # concurrent ffmpeg/mpv processes (asyncio engine)
+
+# HTTP pre-flight probe (one GET: redirects, cookies, content-type, first-bytes sniff)
+HEAD_RETRIES = 2                # attempts, only repeated on network errors
 HEAD_TIMEOUT = 5                # seconds per attempt
+PREFLIGHT_SNIFF_BYTES = 1024    # enough for an #EXTM3U header or 3+ TS packets
+
+# Native HLS probe: master → variant → media playlist → first bytes of one segment.
+# FFmpeg only runs when this check is inconclusive.
+HLS_NATIVE_PROBE = True
+HLS_TIMEOUT = 8                 # seconds per playlist/segment request
+HLS_MAX_PLAYLIST_BYTES = 512 * 1024
+HLS_SEGMENT_BYTES = 1024        # range-GET size for the sync-pattern check
+
+# Shared keep-alive connection pool (HEAD, light GET, redirect resolution)
+HTTP_POOL_HOSTS = 256           # distinct host pools kept alive
+HTTP_POOL_PER_HOST = 16         # max open connections per host (workers wait for a free one)
 
 # FFmpeg probe
 FFMPEG_TIMEOUT = 20             # subprocess timeout (seconds)
@@ -34,6 +104,7 @@ FFMPEG_TEST_DURATION = 2        # seconds of demuxing work
 MAX_ALLOWED_DURATION = 12       # classify above this as "slow" (still online)
 FFMPEG_ANALYZE = 1_000_000      # reduced when FAST_MODE
 FFMPEG_PROBESIZE = 1_000_000    # reduced when FAST_MODE
+PROBE_METRIC_KEYS = ("ttff_s", "realtime_speed", "bitrate_kbps", "resolution")  # per-link, from -progress
 
 # MPV fallback probe (used only if FFmpeg fails)
 MPV_TIMEOUT = 150
@@ -79,55 +150,42 @@ FATAL_PATTERNS = [
 ]
 
 # -----------------------------------------------------------------------------
-# Your existing lists (preserved)
+# Your existing lists (moved to static_channels_lists.json, next to this script)
+#   "exclude":   channel-name substrings (case-insensitive) skipped entirely
+#   "whitelist": URL substrings auto-marked as online
 # -----------------------------------------------------------------------------
-EXCLUDE_LIST = [
-    # "NEWS | Republic Bharat",
-    # "NEWS | Aaj Tak HD",
-]
-
-# ✅ Whitelist domains (any URL containing these will be auto-marked as online)
-WHITELIST_DOMAINS = [
-    "https://amg00721-amg00721c6-freelivesports-emea-9595.playouts.now.amagi.tv/ts-eu-w1-n2/playlist/amg00721-inverleigh-unbtn3row-freelivesportsemea",
-    "https://amg01448-samsungin-cnbcawaaznw18-samsungin-ad-wj.amagi.tv/ts-ap-s1-n1/playlist/amg01448-samsungin-cnbcawaaznw18-samsungin",
-    "https://amg01448-samsungin-cnnnewsnw18-samsungin-ad-gv.amagi.tv/ts-eu-w1-n2/playlist/amg01448-samsungin-cnnnewsnw18-samsungin",
-    "https://amg01448-samsungin-abpananda-samsungin-ad-pw.amagi.tv/ts-ap-s1-n1/playlist/amg01448-samsungin-abpananda-samsungin",
-    "https://amg01448-samsungin-enterr10bangla-samsungin-ad-gg.amagi.tv/playlist/amg01448-samsungin-enterr10bangla-samsungin",
-    "https://amg01412-xiaomiasia-zee24ghantaa-xiaomi-cvo5n.amagi.tv/playlist/amg01412-xiaomiasia-zee24ghantaa-xiaomi",
-    "https://ndtvindiaelemarchana.akamaized.net/hls/live/2003679/ndtvindia",
-    "https://amg01448-samsungin-news18bangla-samsungin-ad-qy.amagi.tv",
-    "http://mdstrm.com/live-stream-playlist/57b4dc126338448314449d0c",
-    "https://amg01448-samsungin-tv9bangla-samsungin-9lgnh.amagi.tv",
-    "https://amg13643-amg13643c1-amgplt0016.playout.now3.amagi.tv",
-    "https://2-fss-2.streamhoster.com/pl_140/amlst:200914-1298290",
-    "https://yupptvcatchupire.yuppcdn.net/preview/colorsbanglahd",
-    "https://livehub-voidnet.onrender.com/cluster/streamcore/in",
-    "https://vg-republictvlive.akamaized.net/v1/master",
-    "https://epiconvh.akamaized.net/live/filamchi",
-    "https://premierleagpl23.akamaized.net",
-    "https://indiatodaylive.akamaized.net",
-    "http://103.73.107.122:3255/TSportsHD",
-    "https://nomawnoijl.gpcdn.net/akash",
-    "https://streams.spacetoon.com",
-    "https://owrcovcrpy.gpcdn.net",
-    "https://pepsi.abntv.live/hls",
-    "http://198.195.239.50:8095",
-    "http://al.hls.huya.com/src",
-    "https://feeds.intoday.in",
-    "http://cdn01.palki.tv",
-    "http://103.182.170.32",
-]
+LISTS_FILE = Path(__file__).resolve().parent / "static_channels_lists.json"
+with open(LISTS_FILE, "r", encoding="utf-8") as f:
+    _lists = json_fast.load(f)
+EXCLUDE_LIST: List[str] = _lists.get("exclude", [])
+WHITELIST_DOMAINS: List[str] = _lists.get("whitelist", [])
 
 # -----------------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------------
 
+def _substring_re(patterns: List[str], casefold: bool = False) -> re.Pattern:
+    """
+    One alternation over a fixed pattern list: `.search(text)` is
+    `any(p in text for p in patterns)` in a single C-level scan, whatever the list size.
+    """
+    # "" would match everything; treat it as a config slip. No patterns → never matches.
+    alts = [re.escape(p.lower() if casefold else p) for p in patterns if p]
+    return re.compile("|".join(alts) if alts else r"(?!)")
+
+
+_EXCLUDE_RE = _substring_re(EXCLUDE_LIST, casefold=True)
+_WHITELIST_RE = _substring_re(WHITELIST_DOMAINS)
+
+
+@functools.lru_cache(maxsize=None)
 def is_excluded(channel_name: str) -> bool:
-    return any(skip.lower() in channel_name.lower() for skip in EXCLUDE_LIST)
+    return _EXCLUDE_RE.search(channel_name.lower()) is not None
 
 
+@functools.lru_cache(maxsize=None)
 def is_whitelisted(url: str) -> bool:
-    return any(domain in (url or "") for domain in WHITELIST_DOMAINS)
+    return _WHITELIST_RE.search(url or "") is not None
 
 
 def ffmpeg_header_arg(extra_cookie: str = "") -> list:
@@ -165,17 +223,30 @@ def mpv_header_args(cookies: str = "") -> list:
     return args
 
 
-def resolve_url(url: str) -> Tuple[str, str]:
-    """Follow redirects and gather cookies for header injection in ffmpeg/mpv."""
-    try:
-        with requests.Session() as session:
-            with session.get(url, headers=HEADERS, allow_redirects=True, timeout=20, stream=True) as r:
-                cookies = r.cookies.get_dict()
-                final_url = r.url
-        cookie_header = "; ".join([f"{k}={v}" for k, v in cookies.items()])
-        return final_url, cookie_header
-    except Exception:
-        return url, ""
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """
+    Process-wide requests.Session shared by every worker, so repeated probes to the
+    same CDN host reuse keep-alive connections instead of paying TCP+TLS each time.
+    Cookies are never stored on the session; each link only sees its own.
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_HOSTS,
+                pool_maxsize=HTTP_POOL_PER_HOST,
+                pool_block=True,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+            _SESSION = session
+    return _SESSION
 
 
 def _is_valid_content_type(ct: str) -> bool:
@@ -187,41 +258,200 @@ def _is_valid_content_type(ct: str) -> bool:
     return False
 
 
-def head_pass(url: str) -> Tuple[bool, Optional[str]]:
-    """HEAD (then light GET) probe. Return (ok, reason_if_any)."""
+def _sniff_kind(data: bytes) -> Optional[str]:
+    """Identify a playlist/media payload from its first bytes: 'm3u8' | 'ts' | 'mp4' | None."""
+    if not data:
+        return None
+    if data.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"#EXTM3U"):
+        return "m3u8"
+    if all(data[i] == 0x47 for i in range(0, min(len(data), 3 * 188), 188)):
+        return "ts"
+    if data[4:8] in (b"ftyp", b"styp", b"moof", b"sidx"):
+        return "mp4"
+    return None
+
+
+@dataclass
+class Preflight:
+    """Result of the single HTTP pre-flight request, handed on to the ffmpeg/mpv stages."""
+    ok: bool
+    reason: Optional[str]
+    final_url: str
+    cookies: str = ""
+    content_type: str = ""
+    sniff: bytes = b""              # first bytes; the whole playlist when it is an HLS manifest
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = False      # 304 answer to a conditional pre-flight
+
+
+class ProbeResult(NamedTuple):
+    url: str
+    status: str
+    note: Optional[str]
+    dur: Optional[float]
+    via: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    cached: bool = False            # no full probe ran (cache revalidation / liveness mark); metrics carried over
+    metrics: Optional[Dict] = None  # FfmpegWatch.metrics(): ttff_s, realtime_speed, bitrate_kbps, resolution
+
+
+def _cookie_header(cookies: Dict[str, str]) -> str:
+    return "; ".join([f"{k}={v}" for k, v in cookies.items()])
+
+
+def _preflight_verdict(url: str, status_code: int, final_url: str, cookies: str,
+                       headers, sniff: bytes) -> Preflight:
+    ct = headers.get("Content-Type", "")
+    etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+    if status_code == 304:
+        return Preflight(True, None, final_url, cookies, ct, sniff, etag, last_modified, not_modified=True)
+    if _is_valid_content_type(ct) or (status_code < 400 and _sniff_kind(sniff)):
+        return Preflight(True, None, final_url, cookies, ct, sniff, etag, last_modified)
+    return _preflight_failed(url, f"GET {status_code} content-type={ct or 'n/a'}", final_url, cookies, ct)
+
+
+def _preflight_failed(url: str, reason: str, final_url: str = "", cookies: str = "", ct: str = "") -> Preflight:
+    # If it's an m3u8, still allow deeper probing
+    ok = str(url).lower().endswith(".m3u8")
+    return Preflight(ok, reason, final_url or url, cookies, ct)
+
+
+def preflight(url: str, conditional: Optional[Dict[str, str]] = None) -> Preflight:
+    """
+    One GET per link: follow the redirect chain once, keep the final URL, cookies and
+    content-type, and read the first bytes to sniff the payload. The body is never
+    downloaded past PREFLIGHT_SNIFF_BYTES. Only network errors are retried.
+    `conditional` adds If-None-Match / If-Modified-Since from the probe cache.
+    """
+    headers = {**HEADERS, **(conditional or {})}
     last_error = None
-    for _ in range(HEAD_RETRIES):
+    for attempt in range(HEAD_RETRIES):
+        if attempt:
+            time.sleep(0.6)
         try:
-            r = requests.head(url, headers=HEADERS, allow_redirects=True, timeout=HEAD_TIMEOUT)
-            ct = r.headers.get("Content-Type", "")
-            if _is_valid_content_type(ct):
-                return True, None
-            last_error = f"HEAD content-type={ct or 'n/a'}"
-        except Exception as e_head:
-            last_error = f"HEAD error: {e_head}"
-        try:
-            r2 = requests.get(url, headers=HEADERS, allow_redirects=True, stream=True, timeout=HEAD_TIMEOUT)
-            ct2 = r2.headers.get("Content-Type", "")
-            r2.close()
-            if _is_valid_content_type(ct2):
-                return True, None
-            last_error = f"GET content-type={ct2 or 'n/a'}"
-        except Exception as e_get:
-            last_error = f"GET error: {e_get}"
-        time.sleep(0.6)
+            with http_session().get(url, headers=headers, allow_redirects=True, stream=True, timeout=HEAD_TIMEOUT) as r:
+                sniff = r.raw.read(PREFLIGHT_SNIFF_BYTES, decode_content=True) if r.status_code < 400 else b""
+                if HLS_NATIVE_PROBE and _sniff_kind(sniff) == "m3u8":
+                    # Keep the manifest so the HLS probe does not fetch it again
+                    sniff += r.raw.read(HLS_MAX_PLAYLIST_BYTES - len(sniff), decode_content=True)
+                return _preflight_verdict(url, r.status_code, r.url, _cookie_header(r.cookies.get_dict()), r.headers, sniff)
+        except Exception as e:
+            last_error = f"GET error: {e}"
+    return _preflight_failed(url, last_error)
 
-    # If it's an m3u8, still allow deeper probing
-    if str(url).lower().endswith(".m3u8"):
-        return True, last_error
-    return False, last_error
 
+# -----------------------------------------------------------------------------
+# Native HLS probe
+# -----------------------------------------------------------------------------
+
+_HLS_BANDWIDTH_RE = re.compile(r'BANDWIDTH=(\d+)')
+_HLS_URI_RE = re.compile(r'URI="([^"]+)"')
+_HLS_METHOD_RE = re.compile(r'METHOD=([A-Z0-9-]+)')
+
+
+def _parse_m3u8(text: str, base_url: str) -> Dict:
+    """
+    Minimal HLS playlist parser. Returns
+    {"variants": [(bandwidth, url)], "segments": [url], "init": url|None, "encrypted": bool}
+    """
+    variants, segments = [], []
+    init_uri, encrypted = None, False
+    pending_bw = None
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if line.startswith("#EXT-X-STREAM-INF"):
+            m = _HLS_BANDWIDTH_RE.search(line)
+            pending_bw = int(m.group(1)) if m else 0
+        elif line.startswith(("#EXT-X-KEY", "#EXT-X-SESSION-KEY")):
+            m = _HLS_METHOD_RE.search(line)
+            if not m or m.group(1) != "NONE":
+                encrypted = True
+        elif line.startswith("#EXT-X-MAP"):
+            m = _HLS_URI_RE.search(line)
+            if m:
+                init_uri = urljoin(base_url, m.group(1))
+        elif line.startswith("#"):
+            continue
+        elif pending_bw is not None:
+            variants.append((pending_bw, urljoin(base_url, line)))
+            pending_bw = None
+        else:
+            segments.append(urljoin(base_url, line))
+    return {"variants": variants, "segments": segments, "init": init_uri, "encrypted": encrypted}
+
+
+def _hls_next_step(pl: Dict) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Decide what to fetch next from a parsed playlist.
+    Returns (variant_url, segment_url, inconclusive_reason); exactly one is set.
+    """
+    if pl["encrypted"]:
+        return None, None, "hls encrypted"
+    if pl["variants"]:
+        # Lowest bandwidth variant is the cheapest to confirm
+        return min(pl["variants"], key=lambda v: v[0])[1], None, None
+    if pl["segments"]:
+        # Newest segment: oldest ones of a live window may already be gone
+        return None, pl["segments"][-1], None
+    return None, None, "hls empty playlist"
+
+
+def _hls_headers(cookies: str, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    headers = dict(HEADERS)
+    if cookies:
+        headers["Cookie"] = cookies
+    if extra:
+        headers.update(extra)
+    return headers
 
-def mpv_check(url: str, cookies: str = "", end_secs: int = 10) -> Tuple[bool, Optional[str]]:
-    # ✅ Early guard: skip cleanly if mpv isn't installed/available in PATH
-    if not HAS_MPV:
-        return False, "MPV not available on PATH"
 
-    cmd = [
+def _hls_fetch(url: str, cookies: str, limit: int, range_get: bool = False) -> Tuple[int, str, bytes]:
+    """GET at most `limit` bytes. Returns (status_code, final_url, data)."""
+    extra = {"Range": f"bytes=0-{limit - 1}"} if range_get else None
+    with http_session().get(url, headers=_hls_headers(cookies, extra), allow_redirects=True,
+                            stream=True, timeout=HLS_TIMEOUT) as r:
+        data = r.raw.read(limit, decode_content=True) if r.status_code < 400 else b""
+        return r.status_code, r.url, data
+
+
+def hls_probe(pre: Preflight) -> Tuple[bool, float, Optional[str]]:
+    """
+    Pure-Python HLS health check: master → lowest variant → media playlist → range-GET
+    of one segment, which must start with a TS or fMP4 sync pattern.
+    Returns (healthy, duration, note). Not healthy means inconclusive → run FFmpeg.
+    """
+    start = time.time()
+    text, base = pre.sniff.decode("utf-8", errors="replace"), pre.final_url
+    try:
+        for _ in range(3):  # master → media; one spare hop for nested masters
+            variant, segment, reason = _hls_next_step(_parse_m3u8(text, base))
+            if reason:
+                return False, time.time() - start, reason
+            if segment:
+                code, _, data = _hls_fetch(segment, pre.cookies, HLS_SEGMENT_BYTES, range_get=True)
+                kind = _sniff_kind(data)
+                if kind in ("ts", "mp4"):
+                    return True, time.time() - start, f"hls {kind}"
+                return False, time.time() - start, f"hls segment {code} unrecognised"
+            code, base, data = _hls_fetch(variant, pre.cookies, HLS_MAX_PLAYLIST_BYTES)
+            if _sniff_kind(data) != "m3u8":
+                return False, time.time() - start, f"hls variant {code}"
+            text = data.decode("utf-8", errors="replace")
+    except Exception as e:
+        return False, time.time() - start, f"hls error: {e}"
+    return False, time.time() - start, "hls too many playlist hops"
+
+
+# -----------------------------------------------------------------------------
+# FFmpeg / MPV probes
+# -----------------------------------------------------------------------------
+
+def _mpv_cmd(url: str, cookies: str = "", end_secs: int = 10) -> list:
+    return [
         MPV_EXECUTABLE,
         "--no-config",             # deterministic in CI
         "--no-video",
@@ -238,12 +468,24 @@ def mpv_check(url: str, cookies: str = "", end_secs: int = 10) -> Tuple[bool, Op
         *mpv_header_args(cookies),
         url,
     ]
+
+
+def _mpv_verdict(returncode: int, stderr: str) -> Tuple[bool, Optional[str]]:
+    if returncode == 0:
+        return True, None
+    last = (stderr or "").strip().splitlines()[-1] if (stderr or "").strip() else ""
+    return False, f"MPV rc={returncode}" + (f" | {last}" if last else "")
+
+
+def mpv_check(url: str, cookies: str = "", end_secs: int = 10) -> Tuple[bool, Optional[str]]:
+    # ✅ Early guard: skip cleanly if mpv isn't installed/available in PATH
+    if not HAS_MPV:
+        return False, "MPV not available on PATH"
+
+    cmd = _mpv_cmd(url, cookies, end_secs)
     try:
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=MPV_TIMEOUT)
-        if result.returncode == 0:
-            return True, None
-        last = (result.stderr or "").strip().splitlines()[-1] if result.stderr else ""
-        return False, f"MPV rc={result.returncode}" + (f" | {last}" if last else "")
+        return _mpv_verdict(result.returncode, result.stderr)
     except subprocess.TimeoutExpired:
         return False, f"MPV timeout >{MPV_TIMEOUT}s"
     except FileNotFoundError:
@@ -252,29 +494,9 @@ def mpv_check(url: str, cookies: str = "", end_secs: int = 10) -> Tuple[bool, Op
         return False, f"MPV error: {e}"
 
 
-def ffmpeg_check(url: str) -> Tuple[str, float, Optional[str]]:
-    """
-    Run FFmpeg probe. Returns (status, duration, note)
-    status: 'online' | 'slow' | 'offline' | 'mpv_online' | 'mpv_offline'
-    duration: time for the backend that actually ran (FFmpeg OR MPV), seconds
-    """
-    final_url, cookies = resolve_url(url)
-
-    base = [
-        "ffmpeg",
-        *ffmpeg_header_arg(cookies),
-        "-rw_timeout", "10000000",         # 10s read timeout (microseconds)
-        "-reconnect", "1",
-        "-reconnect_streamed", "1",
-        "-reconnect_delay_max", "2",
-        "-loglevel", "error",
-        "-i", final_url,
-        "-t", str(FFMPEG_TEST_DURATION),
-        "-f", "null", "-",
-    ]
-
+def _ffmpeg_cmd(final_url: str, cookies: str = "") -> list:
     if FAST_MODE:
-        base = [
+        return [
             "ffmpeg",
             *ffmpeg_header_arg(cookies),
             "-probesize", str(FFMPEG_PROBESIZE // 2),
@@ -283,41 +505,189 @@ def ffmpeg_check(url: str) -> Tuple[str, float, Optional[str]]:
             "-reconnect", "1",
             "-reconnect_streamed", "1",
             "-reconnect_delay_max", "2",
-            "-loglevel", "error",
+            "-loglevel", "level+info",  # [level] tags: Stream line for resolution, fatal match on [error] only
+            "-nostats", "-progress", "pipe:1",
             "-i", final_url,
             "-t", "1",
             "-f", "null", "-",
         ]
+    return [
+        "ffmpeg",
+        *ffmpeg_header_arg(cookies),
+        "-rw_timeout", "10000000",         # 10s read timeout (microseconds)
+        "-reconnect", "1",
+        "-reconnect_streamed", "1",
+        "-reconnect_delay_max", "2",
+        "-loglevel", "level+info",  # [level] tags: Stream line for resolution, fatal match on [error] only
+        "-nostats", "-progress", "pipe:1",  # key=value progress on stdout (stderr merged in)
+        "-i", final_url,
+        "-t", str(FFMPEG_TEST_DURATION),
+        "-f", "null", "-",
+    ]
+
+
+_FF_LEVEL_RE = re.compile(r"\[(trace|debug|verbose|info|warning|error|fatal|panic)\]")
+_FF_VIDEO_RE = re.compile(r"stream #.*video:.*?\b(\d{2,5})x(\d{2,5})\b")
+_FF_ERROR_LEVELS = ("error", "fatal", "panic")
+
+
+class FfmpegWatch:
+    """
+    Line-by-line view of a running ffmpeg (stderr merged into the -progress stream).
+    feed() returns True as soon as the process can be stopped: on the first fatal
+    error line, or once the progress clock has covered the whole -t window.
+    Along the way it collects the link metrics exposed by metrics().
+    """
+
+    def __init__(self):
+        self.window_us = (1 if FAST_MODE else FFMPEG_TEST_DURATION) * 1_000_000
+        self.started = time.monotonic()
+        self.out_time_us = 0
+        self.reached = False
+        self.ended = False                      # progress=end: ffmpeg is exiting on its own
+        self.fatal: Optional[str] = None
+        self.errors: List[str] = []
+        self.ttff: Optional[float] = None       # spawn → first progress block with media out
+        self.speed: Optional[float] = None      # ffmpeg's own realtime ratio (excludes process/connection setup)
+        self.bitrate: Optional[float] = None    # kbit/s
+        self.resolution: Optional[str] = None
+
+    def feed(self, line: str) -> bool:
+        line = line.strip()
+        key, sep, value = line.partition("=")
+        if sep and key.isidentifier():
+            return self._progress(key, value.strip())
+        if not line:
+            return False
+        low = line.lower()
+        m = _FF_LEVEL_RE.search(low)
+        if m and m.group(1) not in _FF_ERROR_LEVELS:
+            if self.resolution is None:
+                v = _FF_VIDEO_RE.search(low)
+                if v:
+                    self.resolution = f"{v.group(1)}x{v.group(2)}"
+            return False
+        # [error]/[fatal] lines, or untagged output
+        self.errors.append(low)
+        if any(p in low for p in FATAL_PATTERNS):
+            self.fatal = low
+            return True
+        return False
+
+    def _progress(self, key: str, value: str) -> bool:
+        # -progress block: frame, bitrate, out_time_us (out_time_ms is also microseconds), speed, ..., progress=
+        if key in ("out_time_us", "out_time_ms") and value.isdigit():
+            self.out_time_us = max(self.out_time_us, int(value))
+            if self.out_time_us > 0 and self.ttff is None:
+                self.ttff = time.monotonic() - self.started
+            self.reached = self.out_time_us >= self.window_us
+        elif key == "progress":
+            self.ended = value == "end"
+            return self.reached  # stop at the end of the block that covers the window
+        elif key == "speed" and value.endswith("x"):
+            try:
+                self.speed = float(value[:-1])
+            except ValueError:
+                pass
+        elif key == "bitrate" and value.endswith("kbits/s"):
+            try:
+                self.bitrate = float(value[:-7])
+            except ValueError:
+                pass
+        return False
+
+    def metrics(self) -> Optional[Dict]:
+        """Per-link metrics for a run that produced media, else None."""
+        if self.ttff is None:
+            return None
+        return {
+            "ttff_s": round(self.ttff, 3),
+            "realtime_speed": round(self.speed, 3) if self.speed is not None else None,
+            "bitrate_kbps": round(self.bitrate, 1) if self.bitrate is not None else None,
+            "resolution": self.resolution,
+        }
+
+    def verdict(self, returncode: Optional[int], dur: float, timed_out: bool) -> Optional[str]:
+        """
+        'online' | 'slow' | 'fatal' (→ MPV quick try) | 'timeout' (→ MPV) | None (retry).
+        """
+        if self.reached or returncode == 0:
+            return "slow" if dur >= MAX_ALLOWED_DURATION else "online"
+        if self.fatal:
+            return "fatal"
+        if timed_out:
+            return "timeout"
+        # Unknown error; treat as offline (retry loop may try again)
+        return None
+
+    @property
+    def stderr(self) -> str:
+        return "\n".join(self.errors)
+
+
+def run_ffmpeg(cmd: list) -> Tuple[FfmpegWatch, Optional[int], bool]:
+    """
+    Stream ffmpeg output line by line and kill it on the first decisive line instead of
+    waiting for exit or FFMPEG_TIMEOUT. Returns (watch, returncode, timed_out).
+    """
+    watch = FfmpegWatch()
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True, errors="replace")
+    expired = threading.Event()
+
+    def _expire():
+        expired.set()
+        proc.kill()
+
+    timer = threading.Timer(FFMPEG_TIMEOUT, _expire)
+    timer.start()
+    try:
+        for line in proc.stdout:
+            if watch.feed(line):
+                proc.kill()  # window covered or fatal error
+                break
+            if watch.ended:
+                break        # input ran out first: let ffmpeg exit normally
+        proc.wait()          # still under the FFMPEG_TIMEOUT timer
+    finally:
+        timer.cancel()
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        returncode = proc.wait()
+    return watch, returncode, expired.is_set()
+
+
+def ffmpeg_check(url: str, pre: Optional[Preflight] = None) -> Tuple[str, float, Optional[str], Optional[Dict]]:
+    """
+    Run FFmpeg probe. Returns (status, duration, note, metrics)
+    status: 'online' | 'slow' | 'offline' | 'mpv_online' | 'mpv_offline'
+    duration: time for the backend that actually ran (FFmpeg OR MPV), seconds
+    metrics: FfmpegWatch.metrics() when FFmpeg passed, else None
+    `pre` carries the already-resolved URL and cookies from preflight().
+    """
+    pre = pre or preflight(url)
+    final_url, cookies = pre.final_url, pre.cookies
+    base = _ffmpeg_cmd(final_url, cookies)
 
     last_stderr = ""
     for _ in range(RETRIES + 1):
         try:
             start = time.time()
-            result = subprocess.run(base, capture_output=True, text=True, timeout=FFMPEG_TIMEOUT)
+            watch, returncode, timed_out = run_ffmpeg(base)
             dur = time.time() - start
-            stderr = (result.stderr or "").lower()
-            last_stderr = stderr
+            last_stderr = watch.stderr
 
-            if result.returncode == 0:
-                if dur >= MAX_ALLOWED_DURATION:
-                    return "slow", dur, None
-                return "online", dur, None
+            verdict = watch.verdict(returncode, dur, timed_out)
+            if verdict in ("online", "slow"):
+                return verdict, dur, None, watch.metrics()
 
-            # Non-zero rc; inspect stderr for fatal patterns → MPV quick try (TIMED)
-            if any((p in stderr) for p in FATAL_PATTERNS):
+            # Fatal pattern (process already killed) or FFmpeg hung → MPV quick try (TIMED)
+            if verdict in ("fatal", "timeout"):
                 t1 = time.time()
                 ok, note = mpv_check(final_url, cookies, end_secs=FFMPEG_TEST_DURATION)
                 dur_mpv = time.time() - t1
-                return ("mpv_online" if ok else "mpv_offline"), dur_mpv, note
-            else:
-                # Unknown error; treat as offline (retry loop may try again)
-                pass
-        except subprocess.TimeoutExpired:
-            # FFmpeg hung → try MPV (TIMED)
-            t1 = time.time()
-            ok, note = mpv_check(final_url, cookies, end_secs=FFMPEG_TEST_DURATION)
-            dur_mpv = time.time() - t1
-            return ("mpv_online" if ok else "mpv_offline"), dur_mpv, note
+                return ("mpv_online" if ok else "mpv_offline"), dur_mpv, note, None
         except Exception as e:
             last_stderr = f"ffmpeg error: {e}"
         time.sleep(0.7)
@@ -326,13 +696,13 @@ def ffmpeg_check(url: str) -> Tuple[str, float, Optional[str]]:
     t1 = time.time()
     ok, note = mpv_check(final_url, cookies, end_secs=FFMPEG_TEST_DURATION)
     dur_mpv = time.time() - t1
-    return ("mpv_online" if ok else "mpv_offline"), dur_mpv, note or last_stderr
+    return ("mpv_online" if ok else "mpv_offline"), dur_mpv, note or last_stderr, None
 
 # -----------------------------------------------------------------------------
 # File outputs preserved from your script
 # -----------------------------------------------------------------------------
 
-def export_excluded_whitelisted(channels: Dict[str, Dict]):
+def export_excluded_whitelisted(channels: Dict[str, Channel]):
     """Export EXCLUDED + WHITELISTED channels into obsolete/excluded_whitelisted.m3u"""
     folder = "obsolete"
     os.makedirs(folder, exist_ok=True)  # ✅ create folder if missing
@@ -343,19 +713,19 @@ def export_excluded_whitelisted(channels: Dict[str, Dict]):
         f.write("#EXTM3U\n")
 
     for channel_name, info in channels.items():
-        for link in info.get("links", []):
-            url = link.get("url")
+        for link in info.links:
+            url = link.url
             if not url:
                 continue
 
             if is_excluded(channel_name) or is_whitelisted(url):
                 with open(output_file, "a", encoding="utf-8") as f:
-                    f.write(f'#EXTINF:-1 group-title="{info.get("group", "Other")}",{channel_name}\n{url}\n')
+                    f.write(f'#EXTINF:-1 group-title="{info.group or "Other"}",{channel_name}\n{url}\n')
 
     print(f"✅ Exported excluded + whitelisted channels to {output_file}")
 
 
-def export_offline(channels: Dict[str, Dict]):
+def export_offline(channels: Dict[str, Channel]):
     """
     Export OFFLINE channels to obsolete/offline.m3u
     Display format for the name: "Channel Name (offline days)"
@@ -371,19 +741,17 @@ def export_offline(channels: Dict[str, Dict]):
     with open(output_file, "w", encoding="utf-8") as f:
         f.write("#EXTM3U\n")
         for channel_name, info in channels.items():
-            group = info.get("group", "Other")
-            for link in info.get("links", []):
-                if not isinstance(link, dict):
-                    continue
-                if link.get("status") != "offline":
+            group = info.group or "Other"
+            for link in info.links:
+                if link.status != "offline":
                     continue
 
-                url = link.get("url") or ""
+                url = link.url or ""
                 if not url.strip():
                     # URL has been reset for long-offline entries; skip emitting empty URLs
                     continue
 
-                last_offline = link.get("last_offline")
+                last_offline = link.last_offline
                 days_str = "unknown"
                 if last_offline:
                     try:
@@ -398,95 +766,904 @@ def export_offline(channels: Dict[str, Dict]):
 
     print(f"✅ Exported {count} offline channel link(s) to {output_file}")
 
+# -----------------------------------------------------------------------------
+# Per-host concurrency + token bucket
+# -----------------------------------------------------------------------------
+
+_SECOND_LEVEL_LABELS = {"co", "com", "net", "org", "gov", "ac", "edu"}
+
+
+def _host_key(url: str) -> str:
+    """
+    Origin bucket for rate limiting: registrable domain (live1.example.com → example.com),
+    with ccTLD second levels kept (x.co.in → x.co.in); IP literals as-is. Hosts under
+    SHARED_CDN_DOMAINS (amg01448-….amagi.tv, d1x….cloudfront.net) keep their full name.
+    """
+    host = (urlparse(url).hostname or "").lower()
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+    labels = host.split(".")
+    keep = 3 if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in _SECOND_LEVEL_LABELS else 2
+    domain = ".".join(labels[-keep:])
+    return host if domain in SHARED_CDN_DOMAINS else domain
+
+
+class TokenBucket:
+    """Thread-safe token bucket; reserve() hands out a token and the delay before it is valid."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1  # may go negative: later callers queue behind earlier ones
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left before `deadline` (time.time()), None for no deadline."""
+    return None if deadline is None else max(0.0, deadline - time.time())
+
+
+class HostLimiter:
+    """Per-origin concurrency cap + token bucket under a global ceiling (thread engine)."""
+
+    def __init__(self):
+        self._global = threading.BoundedSemaphore(GLOBAL_MAX_CONCURRENCY)
+        self._hosts: Dict[str, Tuple[threading.BoundedSemaphore, TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url: str):
+        key = _host_key(url)
+        with self._lock:
+            if key not in self._hosts:
+                self._hosts[key] = (threading.BoundedSemaphore(HOST_MAX_CONCURRENCY),
+                                    TokenBucket(HOST_RATE_PER_S, HOST_BURST))
+            return self._hosts[key]
+
+    @contextmanager
+    def slot(self, url: str, deadline: Optional[float] = None):
+        """
+        Yields True once the probe may start, or False without waiting further when
+        `deadline` (time.time()) passes first: queued behind the host, the token
+        bucket or the global cap.
+        """
+        sem, bucket = self._host(url)
+        if not sem.acquire(timeout=_remaining(deadline)):
+            yield False
+            return
+        try:
+            delay = bucket.reserve()
+            if _remaining(deadline) is not None and delay > _remaining(deadline):
+                yield False
+                return
+            time.sleep(delay)
+            if not self._global.acquire(timeout=_remaining(deadline)):
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                self._global.release()
+        finally:
+            sem.release()
+
+
+class AsyncHostLimiter:
+    """asyncio twin of HostLimiter (one instance per event loop)."""
+
+    def __init__(self):
+        self._global = asyncio.Semaphore(GLOBAL_MAX_CONCURRENCY)
+        self._hosts: Dict[str, Tuple[asyncio.Semaphore, TokenBucket]] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str, deadline: Optional[float] = None):
+        """Async mirror of HostLimiter.slot()."""
+        key = _host_key(url)
+        if key not in self._hosts:
+            self._hosts[key] = (asyncio.Semaphore(HOST_MAX_CONCURRENCY), TokenBucket(HOST_RATE_PER_S, HOST_BURST))
+        sem, bucket = self._hosts[key]
+        try:
+            await asyncio.wait_for(sem.acquire(), _remaining(deadline))
+        except asyncio.TimeoutError:
+            yield False
+            return
+        try:
+            delay = bucket.reserve()
+            if _remaining(deadline) is not None and delay > _remaining(deadline):
+                yield False
+                return
+            await asyncio.sleep(delay)
+            try:
+                await asyncio.wait_for(self._global.acquire(), _remaining(deadline))
+            except asyncio.TimeoutError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                self._global.release()
+        finally:
+            sem.release()
+
+# -----------------------------------------------------------------------------
+# Probe result cache (sidecar JSON keyed by URL)
+# -----------------------------------------------------------------------------
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class ProbeCache:
+    """
+    Last probe outcome per URL: status, backend, timing and the HTTP validators
+    (ETag / Last-Modified) seen by the pre-flight. `probed_at` is the last full
+    probe, `checked_at` the last time the link was seen at all.
+    """
+
+    def __init__(self, path: str, ttl_hours: float):
+        self.path = path
+        self.ttl = timedelta(hours=ttl_hours)
+        self.entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json_fast.load(f)
+            self.entries = data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            self.entries = {}
+        except json_fast.JSONDecodeError as e:
+            print(f"⚠️ Ignoring malformed {self.path}: {e}")
+            self.entries = {}
+
+    def save(self, keep_urls) -> None:
+        """Persist entries for URLs still present in the catalogue."""
+        keep = set(keep_urls)
+        with self._lock:
+            self.entries = {u: e for u, e in sorted(self.entries.items()) if u in keep}
+            _atomic_write_json(self.path, self.entries)
+
+    def get(self, url: str) -> Optional[Dict]:
+        return self.entries.get(url)
+
+    def conditional_headers(self, url: str) -> Optional[Dict[str, str]]:
+        """
+        Headers for a revalidating pre-flight when the last full probe passed within
+        the TTL ({} if no validators were seen); None means a full probe is due.
+        """
+        entry = self.entries.get(url)
+        if not entry or entry.get("status") != "online" or not entry.get("probed_at"):
+            return None
+        try:
+            probed_at = datetime.fromisoformat(entry["probed_at"])
+        except ValueError:
+            return None
+        if _utc_now() - probed_at > self.ttl:
+            return None
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def is_unchanged(self, url: str, pre: Preflight) -> bool:
+        """True when a revalidating pre-flight shows the resource did not change."""
+        if pre.reason:
+            return False  # only let through by the .m3u8 fallback, not a real answer
+        if pre.not_modified:
+            return True
+        entry = self.entries.get(url) or {}
+        return (pre.etag, pre.last_modified) == (entry.get("etag"), entry.get("last_modified"))
+
+    def record(self, result: ProbeResult) -> None:
+        if not result.url or result.via in ("missing", "excluded", "whitelist"):
+            return
+        now = _utc_now().isoformat()
+        with self._lock:
+            entry = self.entries.setdefault(result.url, {})
+            entry["checked_at"] = now
+            if result.cached:
+                return
+            entry.update({
+                "status": result.status,
+                "probed_at": now,
+                "backend": result.via,
+                "probe_time_s": round(result.dur, 3) if result.dur is not None else None,
+                "etag": result.etag,
+                "last_modified": result.last_modified,
+            })
+
+
+PROBE_CACHE = ProbeCache(PROBE_CACHE_FILE, PROBE_CACHE_TTL_H)
+
+# -----------------------------------------------------------------------------
+# Checkpoint journal (append-only JSONL of per-link results)
+# -----------------------------------------------------------------------------
+
+class ProbeJournal:
+    """
+    Each finished link is appended as {"channel", "idx", "result"} and flushed at
+    once, so a killed run leaves every completed probe on disk for `--resume`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None
+        self._lock = threading.Lock()
+
+    def replay(self) -> List[Tuple[str, int, ProbeResult]]:
+        """Records of a previous run; a torn last line (killed mid-write) is skipped."""
+        records = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json_fast.loads(line)
+                        records.append((rec["channel"], int(rec["idx"]), ProbeResult(**rec["result"])))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+        return records
+
+    def open(self, resume: bool) -> None:
+        if resume:
+            self._drop_torn_tail()
+        self._fh = open(self.path, "a" if resume else "w", encoding="utf-8")
+
+    def _drop_torn_tail(self) -> None:
+        """Cut a torn last line so the next record does not get glued onto it."""
+        try:
+            with open(self.path, "r+b") as f:
+                size = f.seek(0, os.SEEK_END)
+                pos = size
+                while pos > 0:
+                    step = min(4096, pos)
+                    f.seek(pos - step)
+                    chunk = f.read(step)
+                    cut = chunk.rfind(b"\n")
+                    if cut >= 0:
+                        pos = pos - step + cut + 1
+                        break
+                    pos -= step
+                if pos < size:
+                    f.truncate(pos)
+        except FileNotFoundError:
+            pass
+
+    def record(self, channel_name: str, idx: int, result: ProbeResult) -> None:
+        if self._fh is None:
+            return
+        line = json_fast.dumps({"channel": channel_name, "idx": idx, "result": result._asdict()})
+        with self._lock:
+            self._fh.write(line + "\n")
+            self._fh.flush()
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def discard(self) -> None:
+        """Drop the journal once its results are in JSON_FILE."""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+PROBE_JOURNAL = ProbeJournal(PROBE_JOURNAL_FILE)
+
+# -----------------------------------------------------------------------------
+# Adaptive probe scheduler
+# -----------------------------------------------------------------------------
+
+def _days_since(iso_day: Optional[str], today: date) -> Optional[int]:
+    if not iso_day:
+        return None
+    try:
+        return (today - datetime.fromisoformat(iso_day).date()).days
+    except ValueError:
+        return None
+
+
+def _probe_plan(link_entry: Link, today: date) -> Tuple[int, float]:
+    """
+    (priority_class, interval_hours) for one link; lower class is probed first.
+      0 new/unknown · 1 flaky · 2 normal · 3 stable fast · 4 dead (exponential backoff)
+    """
+    status = (link_entry.status or "unknown").lower()
+    via = (link_entry.passed_via or "").lower()
+    speed = float(link_entry.speed or 0.0)
+
+    if status == "offline":
+        days_dead = _days_since(link_entry.last_offline, today) or 0
+        return 4, min(SCHED_BASE_INTERVAL_H * 2 ** days_dead, SCHED_MAX_BACKOFF_H)
+    if status != "online":
+        return 0, 0
+    online_days = _days_since(link_entry.first_online, today)
+    slow = via != "hls" and speed < SCHED_STABLE_MIN_SPEED  # hls passes carry no speed measurement
+    if via == "mpv" or slow or online_days is None or online_days < SCHED_STABLE_DAYS:
+        return 1, SCHED_BASE_INTERVAL_H
+    if via in ("ffmpeg", "hls"):
+        return 3, SCHED_STABLE_INTERVAL_H
+    return 2, SCHED_BASE_INTERVAL_H
+
+
+def schedule_links(jobs: List[Tuple[str, int, Link]]) -> Tuple[List[Tuple[str, int, Link]], List[Tuple[str, int, Link]]]:
+    """
+    Order jobs by priority and hold back links that are not due yet (last check in
+    probe_cache.json is younger than their interval). Returns (due_jobs, deferred_jobs).
+    Links without a URL, excluded or whitelisted are always kept: they cost no probe.
+    """
+    now = _utc_now()
+    today = date.today()
+    slack = timedelta(minutes=SCHED_SLACK_MIN)
+    ranked = []
+    deferred = []
+    for order, (channel_name, idx, link_entry) in enumerate(jobs):
+        url = link_entry.url
+        if not url or is_excluded(channel_name) or is_whitelisted(url):
+            ranked.append(((-1, 0.0, order), (channel_name, idx, link_entry)))
+            continue
+
+        klass, interval_h = _probe_plan(link_entry, today)
+        entry = PROBE_CACHE.get(url) or {}
+        try:
+            elapsed = now - datetime.fromisoformat(entry["checked_at"])
+        except (KeyError, TypeError, ValueError):
+            elapsed = None  # never checked → due now
+
+        if elapsed is not None and interval_h and elapsed + slack < timedelta(hours=interval_h):
+            deferred.append((channel_name, idx, link_entry))
+            continue
+        # Most overdue first within a class
+        overdue = (elapsed / timedelta(hours=interval_h)) if (elapsed is not None and interval_h) else float("inf")
+        ranked.append(((klass, -overdue, order), (channel_name, idx, link_entry)))
+
+    ranked.sort(key=lambda r: r[0])
+
+    # Spread origins within each class (1st link of every host, then 2nd, ...) so the
+    # per-host limits don't leave workers queued behind one busy CDN
+    seen: Dict[Tuple[int, str], int] = {}
+    spread = []
+    for (klass, _, _), job in ranked:
+        key = (klass, _host_key(job[2].url or ""))
+        seen[key] = seen.get(key, -1) + 1
+        spread.append(((klass, seen[key]), job))
+    spread.sort(key=lambda r: r[0])
+    return [job for _, job in spread], deferred
+
+
+def _budget_deadline() -> Optional[float]:
+    return time.time() + PROBE_TIME_BUDGET_S if PROBE_TIME_BUDGET_S > 0 else None
+
+
+def _channel_chains(due: List[Tuple[str, int, Link]], deferred: List[Tuple[str, int, Link]]):
+    """
+    Early-exit units: one chain per channel, in scheduler priority order, holding
+    (index, link_entry, is_due) for every link in the channel's current link order.
+    """
+    chains: Dict[str, List[Tuple[int, Link, bool]]] = {}
+    for channel_name, idx, link_entry in due:
+        chains.setdefault(channel_name, []).append((idx, link_entry, True))
+    for channel_name, idx, link_entry in deferred:
+        if channel_name in chains:
+            chains[channel_name].append((idx, link_entry, False))
+    for chain in chains.values():
+        chain.sort(key=lambda c: c[0])
+    return list(chains.items())
+
+
+def _print_schedule(due: int, deferred: int, over_budget: int = 0):
+    print(f"🗓️ Scheduler: {due} link(s) due, {deferred} deferred (not due)"
+          + (f", {over_budget} skipped (time budget {PROBE_TIME_BUDGET_S}s)" if over_budget else ""))
+
 # -----------------------------------------------------------------------------
 # JSON traversal + status update (parallel)
 # -----------------------------------------------------------------------------
 
-def update_status_parallel(channels: Dict[str, Dict]):
-    """Update status of all links with HEAD → FFmpeg → MPV pipeline."""
+def _collect_link_jobs(channels: Dict[str, Channel]) -> List[Tuple[str, int, Link]]:
+    """(channel_name, index, link_entry) jobs; links were normalized by Link.coerce() at load time."""
+    return [(channel_name, i, link_entry)
+            for channel_name, info in channels.items()
+            for i, link_entry in enumerate(info.links)]
 
-    def task(channel_name: str, link_entry: Dict):
-        """Returns (url, status, note, dur_seconds, via)"""
-        # Small random jitter to avoid thundering-herd
-        time.sleep(random.uniform(0, 0.2))
 
-        url = link_entry.get("url")
-        if not url:
-            return "", "missing", "no url", None, "missing"
+def _apply_journal(channels: Dict[str, Channel], records: List[Tuple[str, int, ProbeResult]]) -> set:
+    """
+    Re-apply journalled results (an interrupted run, or shard outputs) in record
+    order; returns the (channel_name, index) pairs they covered.
+    """
+    jobs = {(ch, idx): entry for ch, idx, entry in _collect_link_jobs(channels)}
+    today = date.today().isoformat()
+    applied = set()
+    for channel_name, idx, result in records:
+        entry = jobs.get((channel_name, idx))
+        if entry is None or (entry.url or "") != result.url:
+            continue  # catalogue changed since the journal was written
+        _apply_result(entry, result, today)
+        PROBE_CACHE.record(result)
+        applied.add((channel_name, idx))
+    return applied
 
-        # Skip excluded channels
-        if is_excluded(channel_name):
-            print(f"[SKIPPED] {channel_name}")
-            return url, "online", "excluded", None, "excluded"
 
-        # Whitelist domains → trust online without probing
-        if is_whitelisted(url):
-            print(f"➡️ (WHITELISTED) {channel_name} -> {url}")
-            return url, "online", "whitelisted", None, "whitelist"
+def _shard_of(url: Optional[str], count: int) -> int:
+    """Stable across processes and runs (unlike hash()); URL-less links go to shard 0."""
+    return zlib.crc32(url.encode("utf-8")) % count if url else 0
 
-        ok_head, reason = head_pass(url)
-        if not ok_head:
-            print(f"🔴 (HEAD-FAIL) {channel_name} | {reason or 'no reason'} -> {url}")
-            return url, "offline", "head", None, "head_fail"
 
-        status, dur, note = ffmpeg_check(url)
+def _plan_jobs(channels: Dict[str, Channel], resumed: frozenset, shard: Optional[Tuple[int, int]]):
+    """
+    Scheduler input for this process: only the links of `shard` (index, count) if
+    set, minus resumed links, which join the deferred ones (status already current).
+    """
+    jobs = _collect_link_jobs(channels)
+    if shard is not None:
+        jobs = [j for j in jobs if _shard_of(j[2].url, shard[1]) == shard[0]]
+    due, deferred = schedule_links([j for j in jobs if (j[0], j[1]) not in resumed])
+    return due, deferred + [j for j in jobs if (j[0], j[1]) in resumed]
+
+
+def _finish_unit(channels: Dict[str, Channel], ch_name: str, out, today: str) -> int:
+    """Apply, cache and journal one unit's [(index, result)]; returns the over-budget count."""
+    over_budget = 0
+    for idx, result in out:
+        if result is None:
+            over_budget += 1
+            continue
+        _apply_result(channels[ch_name].links[idx], result, today)
+        PROBE_CACHE.record(result)
+        PROBE_JOURNAL.record(ch_name, idx, result)
+    return over_budget
+
 
-        if status in ("online", "slow"):
-            print(f"🟢 (FFMPEG) {dur:.1f}s    {channel_name}") # can add this -> {url}
-            return url, "online", note or "ffmpeg", dur, "ffmpeg"
-        elif status == "mpv_online":
-            print(f"🟢 (MPV)    {dur:.1f}s    {channel_name}")  # can add this -> {url}
-            return url, "online", note or "mpv", dur, "mpv"
-        else:
-            print(f"🔴 {channel_name} -> {url}")
-            return url, "offline", status, dur, ("mpv" if status.startswith("mpv_") else "ffmpeg")
+def _precheck(channel_name: str, url: Optional[str]) -> Optional[ProbeResult]:
+    """Resolve links that need no network probe. Returns a task result or None."""
+    if not url:
+        return ProbeResult("", "missing", "no url", None, "missing")
 
-    # Ensure structure is sane and collect futures
-    futures = []
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        for channel_name, info in channels.items():
-            # Ensure 'links' exists and is a list
-            if "links" not in info or not isinstance(info["links"], list):
-                info["links"] = []
+    # Skip excluded channels
+    if is_excluded(channel_name):
+        print(f"[SKIPPED] {channel_name}")
+        return ProbeResult(url, "online", "excluded", None, "excluded")
 
-            for i, link_entry in enumerate(info["links"]):
-                if not link_entry:
-                    info["links"][i] = {"url": None, "status": "missing", "first_online": None, "last_offline": None}
-                    continue
+    # Whitelist domains → trust online without probing
+    if is_whitelisted(url):
+        print(f"➡️ (WHITELISTED) {channel_name} -> {url}")
+        return ProbeResult(url, "online", "whitelisted", None, "whitelist")
+    return None
 
-                if isinstance(link_entry, str):
-                    info["links"][i] = {"url": link_entry, "status": "unknown", "first_online": None, "last_offline": None}
-                    link_entry = info["links"][i]
 
-                link_entry.setdefault("first_online", None)
-                link_entry.setdefault("last_offline", None)
+def _head_fail_result(channel_name: str, url: str, reason: Optional[str]) -> ProbeResult:
+    print(f"🔴 (HEAD-FAIL) {channel_name} | {reason or 'no reason'} -> {url}")
+    return ProbeResult(url, "offline", "head", None, "head_fail")
 
-                futures.append((executor.submit(task, channel_name, link_entry), channel_name, i))
 
-        # Collect results and update JSON in-place
+def _liveness_result(channel_name: str, url: str, link_entry: Link, pre: Preflight) -> ProbeResult:
+    """
+    Pre-flight-only mark for links past the early-exit quota; keeps the last full probe's
+    timing and metrics. Needs a real answer: a failed .m3u8 pre-flight is still `ok`
+    (it would go on to a full probe), but here nothing else checks the link.
+    """
+    if not pre.ok or pre.reason is not None:
+        return _head_fail_result(channel_name, url, pre.reason)
+    print(f"🟢 (HEAD-ONLY)         {channel_name}")
+    return ProbeResult(url, "online", "head only", link_entry.probe_time_s, "head",
+                       pre.etag, pre.last_modified, cached=True)
+
+
+def _cached_result(channel_name: str, url: str, entry: Dict, pre: Preflight) -> ProbeResult:
+    dur = entry.get("probe_time_s")
+    print(f"🟢 (CACHED) {'304' if pre.not_modified else 'ok '}     {channel_name}")
+    return ProbeResult(url, "online", "cached", dur, entry.get("backend") or "ffmpeg",
+                       pre.etag or entry.get("etag"), pre.last_modified or entry.get("last_modified"), cached=True)
+
+
+def _hls_result(channel_name: str, url: str, dur: float, note: Optional[str], pre: Preflight) -> ProbeResult:
+    print(f"🟢 (HLS)    {dur:.1f}s    {channel_name}")
+    return ProbeResult(url, "online", note or "hls", dur, "hls", pre.etag, pre.last_modified)
+
+
+def _probe_result(channel_name: str, url: str, status: str, dur: float, note: Optional[str],
+                  pre: Preflight, metrics: Optional[Dict] = None) -> ProbeResult:
+    """Map an ffmpeg_check outcome to a task result."""
+    if status in ("online", "slow"):
+        print(f"🟢 (FFMPEG) {dur:.1f}s    {channel_name}") # can add this -> {url}
+        return ProbeResult(url, "online", note or "ffmpeg", dur, "ffmpeg", pre.etag, pre.last_modified,
+                           metrics=metrics)
+    elif status == "mpv_online":
+        print(f"🟢 (MPV)    {dur:.1f}s    {channel_name}")  # can add this -> {url}
+        return ProbeResult(url, "online", note or "mpv", dur, "mpv", pre.etag, pre.last_modified)
+    else:
+        print(f"🔴 {channel_name} -> {url}")
+        return ProbeResult(url, "offline", status, dur, ("mpv" if status.startswith("mpv_") else "ffmpeg"))
+
+
+def _apply_result(link_entry: Link, result: ProbeResult, today: str) -> None:
+    """Write one task result back into its link entry."""
+    status, dur, via = result.status, result.dur, result.via
+
+    link_entry.status = status
+    # NEW: speed & timing & via
+    link_entry.probe_time_s = round(dur, 3) if dur is not None else None
+    # Test window / wall time only means something when the window was played;
+    # the native HLS probe just reads a playlist and 1 KB of a segment
+    if via == "head":
+        pass  # liveness mark only: the last full probe's speed still stands
+    elif dur and dur > 0 and via in ("ffmpeg", "mpv"):
+        link_entry.speed = round(FFMPEG_TEST_DURATION / dur, 3)
+    else:
+        link_entry.speed = 0.0
+    link_entry.passed_via = via
+
+    # Stream metrics from ffmpeg -progress; a fresh probe without them drops stale ones
+    if result.metrics:
+        for key, value in result.metrics.items():
+            setattr(link_entry, key, value)
+    elif not result.cached:
+        for key in PROBE_METRIC_KEYS:
+            link_entry.discard(key)
+
+    # Dates
+    if status == "online":
+        if link_entry.first_online is None:
+            link_entry.first_online = today
+        link_entry.last_online = today
+        link_entry.last_offline = None
+    elif status == "offline":
+        if link_entry.last_offline is None:
+            link_entry.last_offline = today
+
+
+def update_status_parallel(channels: Dict[str, Channel], resumed: frozenset = frozenset(),
+                           shard: Optional[Tuple[int, int]] = None):
+    """
+    Update status of all links with pre-flight GET → HLS/FFmpeg → MPV pipeline.
+    `resumed` (channel_name, index) pairs already hold this run's result;
+    `shard` (index, count) restricts the run to that slice of the links.
+    """
+
+    deadline = _budget_deadline()
+    limiter = HostLimiter()
+
+    def task(channel_name: str, link_entry: Link, head_only: bool = False) -> Optional[ProbeResult]:
+        url = link_entry.url
+        skip = _precheck(channel_name, url)
+        if skip is not None:
+            return skip
+
+        # Per-origin cap + token bucket replace the old random jitter; a job still
+        # queued there when the time budget runs out gives up instead of waiting
+        with limiter.slot(url, deadline) as started:
+            if not started or (deadline is not None and time.time() > deadline):
+                return None  # out of time budget: keep the previous status
+            if head_only:
+                return _liveness_result(channel_name, url, link_entry, preflight(url))
+            return probe(channel_name, url)
+
+    def probe(channel_name: str, url: str) -> ProbeResult:
+        conditional = PROBE_CACHE.conditional_headers(url)
+        pre = preflight(url, conditional)
+        if not pre.ok:
+            return _head_fail_result(channel_name, url, pre.reason)
+        if conditional is not None and PROBE_CACHE.is_unchanged(url, pre):
+            return _cached_result(channel_name, url, PROBE_CACHE.get(url), pre)
+
+        if HLS_NATIVE_PROBE and _sniff_kind(pre.sniff) == "m3u8":
+            healthy, dur, note = hls_probe(pre)
+            if healthy:
+                return _hls_result(channel_name, url, dur, note, pre)
+
+        status, dur, note, metrics = ffmpeg_check(url, pre)
+        return _probe_result(channel_name, url, status, dur, note, pre, metrics)
+
+    def single(channel_name: str, idx: int, link_entry: Link):
+        return [(idx, task(channel_name, link_entry))]
+
+    def chain(channel_name: str, links: List[Tuple[int, Link, bool]]):
+        """Early exit: walk the channel's links in order, full probes until N are online."""
+        healthy, out = 0, []
+        for idx, link_entry, due in links:
+            if not due:
+                healthy += link_entry.status == "online"
+                continue
+            result = task(channel_name, link_entry, head_only=healthy >= EARLY_EXIT_HEALTHY)
+            out.append((idx, result))
+            healthy += result is not None and result.status == "online"
+        return out
+
+    # Ensure structure is sane, schedule by history and collect futures (priority order)
+    jobs, deferred = _plan_jobs(channels, resumed, shard)
+    futures = {}
+    over_budget = 0
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        if EARLY_EXIT_HEALTHY > 0:
+            for channel_name, links in _channel_chains(jobs, deferred):
+                futures[executor.submit(chain, channel_name, links)] = channel_name
+        else:
+            for channel_name, i, link_entry in jobs:
+                futures[executor.submit(single, channel_name, i, link_entry)] = channel_name
+
+        # Update JSON in-place and checkpoint as results come in
         today = date.today().isoformat()
-        for future, ch_name, idx in futures:
-            url, status, note, dur, via = future.result()
-            link_entry = channels[ch_name]["links"][idx]
-
-            link_entry["status"] = status
-            # NEW: speed & timing & via
-            link_entry["probe_time_s"] = round(dur, 3) if dur is not None else None
-            if dur and dur > 0:
-                link_entry["speed"] = round(FFMPEG_TEST_DURATION / dur, 3)
-            else:
-                link_entry["speed"] = 0.0
-            link_entry["passed_via"] = via
+        for future in as_completed(futures):
+            over_budget += _finish_unit(channels, futures[future], future.result(), today)
+    _print_schedule(len(jobs), len(deferred), over_budget)
+
+# -----------------------------------------------------------------------------
+# Asyncio probe engine (PROBE_ENGINE=asyncio)
+# -----------------------------------------------------------------------------
 
-            # Dates
-            if status == "online":
-                if link_entry.get("first_online") is None:
-                    link_entry["first_online"] = today
-                link_entry["last_online"] = today
-                link_entry["last_offline"] = None
-            elif status == "offline":
-                if link_entry.get("last_offline") is None:
-                    link_entry["last_offline"] = today
+async def _read_upto(stream, n: int) -> bytes:
+    """Read at most n bytes from an aiohttp StreamReader (fewer only at EOF)."""
+    buf = b""
+    while len(buf) < n:
+        chunk = await stream.read(n - len(buf))
+        if not chunk:
+            break
+        buf += chunk
+    return buf
+
+
+class AsyncProber:
+    """
+    Non-blocking twin of the pre-flight → FFmpeg → MPV pipeline.
+    HTTP probes and ffmpeg/mpv processes run under separate concurrency limits,
+    so a few slow subprocesses never starve the cheap HTTP stage (or vice versa).
+    """
+
+    def __init__(self, session=None):
+        self.session = session  # aiohttp.ClientSession, or None → blocking helpers in worker threads
+        self.deadline = _budget_deadline()
+        self.limiter = AsyncHostLimiter()
+        self.http_sem = asyncio.Semaphore(ASYNC_HTTP_CONCURRENCY)
+        self.proc_sem = asyncio.Semaphore(ASYNC_PROC_CONCURRENCY)
+
+    async def preflight(self, url: str, conditional: Optional[Dict[str, str]] = None) -> Preflight:
+        """Async mirror of preflight()."""
+        if self.session is None:
+            async with self.http_sem:
+                return await asyncio.to_thread(preflight, url, conditional)
+
+        headers = {**HEADERS, **(conditional or {})}
+        timeout = aiohttp.ClientTimeout(total=HEAD_TIMEOUT)
+        last_error = None
+        for attempt in range(HEAD_RETRIES):
+            if attempt:
+                await asyncio.sleep(0.6)
+            async with self.http_sem:
+                try:
+                    # Body is read only up to the sniff size; leaving the context drops the connection
+                    async with self.session.get(url, headers=headers, allow_redirects=True, timeout=timeout) as r:
+                        sniff = await _read_upto(r.content, PREFLIGHT_SNIFF_BYTES) if r.status < 400 else b""
+                        if HLS_NATIVE_PROBE and _sniff_kind(sniff) == "m3u8":
+                            sniff += await _read_upto(r.content, HLS_MAX_PLAYLIST_BYTES - len(sniff))
+                        cookies = _cookie_header({k: m.value for k, m in r.cookies.items()})
+                        return _preflight_verdict(url, r.status, str(r.url), cookies, r.headers, sniff)
+                except Exception as e:
+                    last_error = f"GET error: {e}"
+        return _preflight_failed(url, last_error)
+
+    async def _hls_fetch(self, url: str, cookies: str, limit: int, range_get: bool = False) -> Tuple[int, str, bytes]:
+        extra = {"Range": f"bytes=0-{limit - 1}"} if range_get else None
+        async with self.http_sem:
+            async with self.session.get(url, headers=_hls_headers(cookies, extra), allow_redirects=True,
+                                        timeout=aiohttp.ClientTimeout(total=HLS_TIMEOUT)) as r:
+                data = await _read_upto(r.content, limit) if r.status < 400 else b""
+                return r.status, str(r.url), data
+
+    async def hls_probe(self, pre: Preflight) -> Tuple[bool, float, Optional[str]]:
+        """Async mirror of hls_probe()."""
+        if self.session is None:
+            async with self.http_sem:
+                return await asyncio.to_thread(hls_probe, pre)
+
+        start = time.time()
+        text, base = pre.sniff.decode("utf-8", errors="replace"), pre.final_url
+        try:
+            for _ in range(3):
+                variant, segment, reason = _hls_next_step(_parse_m3u8(text, base))
+                if reason:
+                    return False, time.time() - start, reason
+                if segment:
+                    code, _, data = await self._hls_fetch(segment, pre.cookies, HLS_SEGMENT_BYTES, range_get=True)
+                    kind = _sniff_kind(data)
+                    if kind in ("ts", "mp4"):
+                        return True, time.time() - start, f"hls {kind}"
+                    return False, time.time() - start, f"hls segment {code} unrecognised"
+                code, base, data = await self._hls_fetch(variant, pre.cookies, HLS_MAX_PLAYLIST_BYTES)
+                if _sniff_kind(data) != "m3u8":
+                    return False, time.time() - start, f"hls variant {code}"
+                text = data.decode("utf-8", errors="replace")
+        except Exception as e:
+            return False, time.time() - start, f"hls error: {e}"
+        return False, time.time() - start, "hls too many playlist hops"
+
+    async def run(self, cmd: list, timeout: float) -> Tuple[int, str]:
+        """Run a subprocess under the process limit. Returns (returncode, stderr); raises asyncio.TimeoutError."""
+        async with self.proc_sem:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                _, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                raise
+            return proc.returncode, (stderr or b"").decode("utf-8", errors="replace")
+
+    async def run_ffmpeg(self, cmd: list) -> Tuple[FfmpegWatch, Optional[int], bool]:
+        """Async mirror of run_ffmpeg()."""
+        watch = FfmpegWatch()
+        async with self.proc_sem:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+
+            async def _pump():
+                async for raw in proc.stdout:
+                    if watch.feed(raw.decode("utf-8", errors="replace")) or watch.ended:
+                        return
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + FFMPEG_TIMEOUT
+            timed_out = False
+            try:
+                await asyncio.wait_for(_pump(), FFMPEG_TIMEOUT)
+                if proc.returncode is None and (watch.reached or watch.fatal):
+                    proc.kill()  # window covered or fatal error
+                # input ran out first: let ffmpeg exit normally, still under FFMPEG_TIMEOUT
+                await asyncio.wait_for(proc.wait(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                timed_out = True
+            finally:
+                if proc.returncode is None:
+                    proc.kill()
+                returncode = await proc.wait()
+            return watch, returncode, timed_out
+
+    async def mpv_check(self, url: str, cookies: str = "", end_secs: int = 10) -> Tuple[bool, Optional[str]]:
+        """Async mirror of mpv_check()."""
+        if not HAS_MPV:
+            return False, "MPV not available on PATH"
+        try:
+            rc, stderr = await self.run(_mpv_cmd(url, cookies, end_secs), MPV_TIMEOUT)
+            return _mpv_verdict(rc, stderr)
+        except asyncio.TimeoutError:
+            return False, f"MPV timeout >{MPV_TIMEOUT}s"
+        except FileNotFoundError:
+            return False, f"MPV not found ('{MPV_EXECUTABLE}'). Install mpv or set MPV_PATH."
+        except Exception as e:
+            return False, f"MPV error: {e}"
+
+    async def _timed_mpv(self, final_url: str, cookies: str) -> Tuple[str, float, Optional[str]]:
+        t1 = time.time()
+        ok, note = await self.mpv_check(final_url, cookies, end_secs=FFMPEG_TEST_DURATION)
+        return ("mpv_online" if ok else "mpv_offline"), time.time() - t1, note
+
+    async def ffmpeg_check(self, url: str, pre: Optional[Preflight] = None) -> Tuple[str, float, Optional[str], Optional[Dict]]:
+        """Async mirror of ffmpeg_check()."""
+        pre = pre or await self.preflight(url)
+        final_url, cookies = pre.final_url, pre.cookies
+        base = _ffmpeg_cmd(final_url, cookies)
+
+        last_stderr = ""
+        for _ in range(RETRIES + 1):
+            try:
+                start = time.time()
+                watch, rc, timed_out = await self.run_ffmpeg(base)
+                dur = time.time() - start
+                last_stderr = watch.stderr
+
+                verdict = watch.verdict(rc, dur, timed_out)
+                if verdict in ("online", "slow"):
+                    return verdict, dur, None, watch.metrics()
+                if verdict in ("fatal", "timeout"):
+                    status, dur_mpv, note = await self._timed_mpv(final_url, cookies)
+                    return status, dur_mpv, note, None
+            except Exception as e:
+                last_stderr = f"ffmpeg error: {e}"
+            await asyncio.sleep(0.7)
+
+        status, dur_mpv, note = await self._timed_mpv(final_url, cookies)
+        return status, dur_mpv, note or last_stderr, None
+
+    async def task(self, channel_name: str, link_entry: Link, head_only: bool = False) -> Optional[ProbeResult]:
+        url = link_entry.url
+        skip = _precheck(channel_name, url)
+        if skip is not None:
+            return skip
+
+        async with self.limiter.slot(url, self.deadline) as started:
+            if not started or (self.deadline is not None and time.time() > self.deadline):
+                return None  # out of time budget: keep the previous status
+            if head_only:
+                return _liveness_result(channel_name, url, link_entry, await self.preflight(url))
+            return await self.probe(channel_name, url)
+
+    async def single(self, channel_name: str, idx: int, link_entry: Link):
+        return [(idx, await self.task(channel_name, link_entry))]
+
+    async def chain(self, channel_name: str, links: List[Tuple[int, Link, bool]]):
+        """Async mirror of the thread engine's early-exit chain."""
+        healthy, out = 0, []
+        for idx, link_entry, due in links:
+            if not due:
+                healthy += link_entry.status == "online"
+                continue
+            result = await self.task(channel_name, link_entry, head_only=healthy >= EARLY_EXIT_HEALTHY)
+            out.append((idx, result))
+            healthy += result is not None and result.status == "online"
+        return out
+
+    async def probe(self, channel_name: str, url: str) -> ProbeResult:
+        conditional = PROBE_CACHE.conditional_headers(url)
+        pre = await self.preflight(url, conditional)
+        if not pre.ok:
+            return _head_fail_result(channel_name, url, pre.reason)
+        if conditional is not None and PROBE_CACHE.is_unchanged(url, pre):
+            return _cached_result(channel_name, url, PROBE_CACHE.get(url), pre)
+
+        if HLS_NATIVE_PROBE and _sniff_kind(pre.sniff) == "m3u8":
+            healthy, dur, note = await self.hls_probe(pre)
+            if healthy:
+                return _hls_result(channel_name, url, dur, note, pre)
+
+        status, dur, note, metrics = await self.ffmpeg_check(url, pre)
+        return _probe_result(channel_name, url, status, dur, note, pre, metrics)
+
+
+async def _update_status_async(channels: Dict[str, Channel], resumed: frozenset, shard: Optional[Tuple[int, int]]):
+    jobs, deferred = _plan_jobs(channels, resumed, shard)
+    today = date.today().isoformat()
+
+    async def finish(ch_name: str, unit) -> int:
+        # Runs on the loop thread as each unit completes: apply + checkpoint
+        return _finish_unit(channels, ch_name, await unit, today)
+
+    async def run_all(prober: AsyncProber):
+        if EARLY_EXIT_HEALTHY > 0:
+            units = [(ch, prober.chain(ch, links)) for ch, links in _channel_chains(jobs, deferred)]
+        else:
+            units = [(ch, prober.single(ch, i, entry)) for ch, i, entry in jobs]
+        return sum(await asyncio.gather(*(finish(ch, unit) for ch, unit in units)))
+
+    if aiohttp is None:
+        print("⚠️ aiohttp not installed; asyncio engine runs HTTP probes in worker threads")
+        over_budget = await run_all(AsyncProber())
+    else:
+        connector = aiohttp.TCPConnector(limit=ASYNC_HTTP_CONCURRENCY, limit_per_host=HTTP_POOL_PER_HOST)
+        async with aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar()) as session:
+            over_budget = await run_all(AsyncProber(session))
+    _print_schedule(len(jobs), len(deferred), over_budget)
+
+
+def update_status_async(channels: Dict[str, Channel], resumed: frozenset = frozenset(),
+                        shard: Optional[Tuple[int, int]] = None):
+    """Same contract as update_status_parallel(), driven by a single asyncio event loop."""
+    asyncio.run(_update_status_async(channels, resumed, shard))
 
 # -----------------------------------------------------------------------------
 # Sorting, summarize, maintenance
@@ -504,16 +1681,16 @@ def categorize_link(channel_name: str, url: Optional[str], status: str) -> str:
     return "ONLINE"
 
 
-def summarize(channels: Dict[str, Dict], start_time: float):
+def summarize(channels: Dict[str, Channel], start_time: float):
     today = date.today()
     entries = []
 
     online_links = offline_links = missing_links = excluded_links = whitelist_links = 0
 
     for channel_name, info in channels.items():
-        for link in info.get("links", []):
-            url = link.get("url")
-            status = link.get("status", "unknown")
+        for link in info.links:
+            url = link.url
+            status = (link.status or "unknown")
 
             category = categorize_link(channel_name, url, status)
 
@@ -532,7 +1709,7 @@ def summarize(channels: Dict[str, Dict], start_time: float):
                 "category": category,
                 "channel": channel_name,
                 "url": url,
-                "last_offline": link.get("last_offline"),
+                "last_offline": link.last_offline,
             })
 
     category_order = {"MISSING": 0, "OFFLINE": 1, "EXCLUDED": 2, "WHITELISTED": 3}
@@ -566,62 +1743,87 @@ def summarize(channels: Dict[str, Dict], start_time: float):
     print(f"{separator}\n")
 
 
-def sort_channels(channels: Dict[str, Dict]) -> Dict[str, Dict]:
+def sort_channels(channels: Dict[str, Channel]) -> Dict[str, Channel]:
     return dict(
         sorted(
             channels.items(),
             key=lambda item: (
-                item[1].get("group", "").lower(),
+                (item[1].group or "").lower(),
                 item[0].lower(),
             )
         )
     )
 
 
-def mark_old_offline_links(channels: Dict[str, Dict], days_threshold: int = 10):
+def mark_old_offline_links(channels: Dict[str, Channel], days_threshold: int = 10):
     today = date.today()
     for channel_name, info in channels.items():
-        for link in info.get("links", []):
-            status = link.get("status", "unknown")
-            last_offline = link.get("last_offline")
+        for link in info.links:
+            status = (link.status or "unknown")
+            last_offline = link.last_offline
             if status == "offline" and last_offline:
                 last_offline_date = datetime.fromisoformat(last_offline).date()
                 offline_days = (today - last_offline_date).days
                 if offline_days >= days_threshold:
-                    print(f"[RESET URL] {channel_name} -> Offline for {offline_days} day(s) -> {link.get('url')}")
-                    link["url"] = ""
+                    print(f"[RESET URL] {channel_name} -> Offline for {offline_days} day(s) -> {link.url}")
+                    link.url = ""
+
 
+# passed_via → ranking class among online links: a full pass this run (native HLS or
+# ffmpeg), the slow mpv fallback, then pre-flight-only marks and anything unknown
+VIA_RANK = {"hls": 0, "ffmpeg": 0, "mpv": 1}
+VIA_RANK_OTHER = 2
 
-def reorder_links(channels: Dict[str, Dict]) -> None:
+
+def _positive(value) -> Optional[float]:
+    return float(value) if isinstance(value, (int, float)) and value > 0 else None
+
+
+def _rank_seconds(link: Link) -> float:
+    """
+    Estimated seconds to deliver the test window: time to first media plus the window
+    at the link's throughput.
+      ffmpeg: ttff_s + window / realtime_speed (ffmpeg's own ratio, setup excluded)
+      hls:    probe time (stops at the first segment bytes) + window at realtime;
+              the native probe proves delivery, not throughput
+      mpv:    probe time, which already covers playing the window
+    Links without any timing sort last.
+    """
+    start = _positive(link.ttff_s) or _positive(link.probe_time_s)
+    if start is None:
+        return float("inf")
+    if (link.passed_via or "").lower() == "mpv":
+        return start
+    return start + FFMPEG_TEST_DURATION / (_positive(link.realtime_speed) or 1.0)
+
+
+def reorder_links(channels: Dict[str, Channel]) -> None:
     """
     Reorder each channel's links:
-      1) ONLINE: non-whitelisted fastest first, prefer ffmpeg on ties
+      1) ONLINE: non-whitelisted, full passes (HLS/ffmpeg) → mpv → head-only; quickest first
+         (_rank_seconds: time to first media + test window at realtime_speed)
       2) ONLINE: whitelisted
       3) OFFLINE
       4) MISSING
     """
-    def key_fn(link: Dict):
-        url = (link.get("url") or "")
-        status = (link.get("status") or "unknown").lower()
+    def key_fn(link: Link):
+        url = (link.url or "")
+        status = (link.status or "unknown").lower()
         is_wl = is_whitelisted(url)
-        spd = float(link.get("speed") or 0.0)  # higher is better
-        via = (link.get("passed_via") or "").lower()
+        via = (link.passed_via or "").lower()
 
         # Primary: ONLINE(0) → OFFLINE(1) → MISSING(2)
         bucket_status = 0 if status == "online" else (1 if status == "offline" else 2)
         # Within ONLINE: non-whitelist(0) → whitelist(1). For non-ONLINE, keep 0 so status dominates
         bucket_wl = (1 if is_wl else 0) if bucket_status == 0 else 0
+        if bucket_status != 0:
+            return (bucket_status, bucket_wl, 0, 0.0)
 
-        # prefer ffmpeg slightly on ties (subtract a tiny epsilon from MPV when sorting)
-        mpv_penalty = 0.01 if via == "mpv" else 0.0
-
-        # Sort ascending; invert speed to get fastest first
-        return (bucket_status, bucket_wl, -(spd - mpv_penalty))
+        return (bucket_status, bucket_wl, VIA_RANK.get(via, VIA_RANK_OTHER), _rank_seconds(link))
 
     for info in channels.values():
-        links = info.get("links")
-        if isinstance(links, list) and links:
-            links.sort(key=key_fn)
+        if info.links:
+            info.links.sort(key=key_fn)
 
 # -----------------------------------------------------------------------------
 # I/O helpers
@@ -630,7 +1832,7 @@ def reorder_links(channels: Dict[str, Dict]) -> None:
 def _atomic_write_json(path: str, payload: Dict):
     dir_ = os.path.dirname(path) or "."
     with tempfile.NamedTemporaryFile("w", dir=dir_, delete=False, encoding="utf-8") as tmp:
-        json.dump(payload, tmp, ensure_ascii=False, indent=2)
+        json_fast.dump(payload, tmp, indent=2)
         tmp.flush()
         os.fsync(tmp.fileno())
     os.replace(tmp.name, path)
@@ -639,22 +1841,75 @@ def _atomic_write_json(path: str, payload: Dict):
 # Main
 # -----------------------------------------------------------------------------
 
+def _parse_shard(value: str) -> Tuple[int, int]:
+    try:
+        index, count = (int(x) for x in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 0..N-1, got {value!r}")
+    return index, count
+
+
 def main():
+    parser = argparse.ArgumentParser(description=f"Probe every link in {JSON_FILE} and rewrite it.")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"reuse results from an interrupted run ({PROBE_JOURNAL_FILE}) and probe only the rest")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--shard", type=_parse_shard, metavar="I/N",
+                      help=f"probe only shard I of N (0-based, by URL hash) and write {SHARD_FILE.format(i='I', n='N')} "
+                           f"instead of {JSON_FILE}")
+    mode.add_argument("--merge", nargs="+", metavar="SHARD_FILE",
+                      help=f"apply shard result files to {JSON_FILE} without probing")
+    args = parser.parse_args()
+    if args.merge and args.resume:
+        parser.error("--resume has no effect with --merge")
+
     start_time = time.time()
 
     # Load JSON
     try:
         with open(JSON_FILE, "r", encoding="utf-8") as f:
-            channels = json.load(f)
+            channels = channels_from_json(json_fast.load(f))  # validates + normalizes links once
     except FileNotFoundError:
         print(f"❌ {JSON_FILE} not found")
         return
-    except json.JSONDecodeError as e:
+    except json_fast.JSONDecodeError as e:
         print(f"❌ Malformed JSON in {JSON_FILE}: {e}")
         return
+    except SchemaError as e:
+        print(f"❌ Unexpected entry in {JSON_FILE}: {e}")
+        return
 
-    # Update status in parallel with HEAD→FFmpeg→MPV
-    update_status_parallel(channels)
+    PROBE_CACHE.load()
+    if args.merge:
+        # Shards cover disjoint links; files are applied in sorted order so the output
+        # depends only on the set of files (a link in two files: the later name wins)
+        records = [rec for path in sorted(args.merge) for rec in ProbeJournal(path).replay()]
+        merged = _apply_journal(channels, records)
+        print(f"🧩 Merged {len(merged)} link result(s) from {len(args.merge)} shard file(s)")
+    else:
+        # A shard's journal is its partial results file
+        if args.shard:
+            PROBE_JOURNAL.path = SHARD_FILE.format(i=args.shard[0], n=args.shard[1])
+        resumed = frozenset()
+        if args.resume:
+            resumed = frozenset(_apply_journal(channels, PROBE_JOURNAL.replay()))
+            print(f"⏯️ Resumed {len(resumed)} link result(s) from {PROBE_JOURNAL.path}")
+        PROBE_JOURNAL.open(resume=args.resume)
+        try:
+            # Update status in parallel with pre-flight→FFmpeg→MPV (cached links only revalidate)
+            if PROBE_ENGINE == "asyncio":
+                update_status_async(channels, resumed, args.shard)
+            else:
+                update_status_parallel(channels, resumed, args.shard)
+        finally:
+            PROBE_JOURNAL.close()
+        if args.shard:
+            print(f"\n✅ Shard {args.shard[0]}/{args.shard[1]} results written to {PROBE_JOURNAL.path} "
+                  f"(combine with --merge)")
+            return
+    PROBE_CACHE.save(link.url for info in channels.values() for link in info.links if link.url)
 
     # Sort channels by group then name
     channels_sorted = sort_channels(channels)
@@ -666,8 +1921,10 @@ def main():
     reorder_links(channels_sorted)
 
     # Save updated and sorted JSON atomically
-    _atomic_write_json(JSON_FILE, channels_sorted)
-    print(f"\n✅ Updated {JSON_FILE} with head/ffmpeg/mpv checks, speed metrics, pass backend, "
+    _atomic_write_json(JSON_FILE, channels_to_json(channels_sorted))
+    if not args.merge:
+        PROBE_JOURNAL.discard()
+    print(f"\n✅ Updated {JSON_FILE} with head/hls/ffmpeg/mpv checks, speed metrics, pass backend, "
           f"reset URLs for old offline links, and sorted by group/name with per-channel link reordering.\n")
 
     # Print summary
@@ -1,4 +1,4 @@
-import json
+import json_fast
 import os
 import subprocess
 from pathlib import Path
@@ -6,6 +6,8 @@ from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Any, List, Tuple
 
+from models import Movie, MovieLink, SchemaError, movies_from_json, movies_to_json
+
 JSON_FILE = "static_movies.json"
 WORKERS = 64  # tuned down a bit; auto-capped below
 FFMPEG_BIN = os.environ.get("FFMPEG_BIN", "ffmpeg")
@@ -61,33 +63,30 @@ def check_ffmpeg(url: str, headers: Dict[str, str] = None) -> str:
     except Exception:
         return "offline"
 
-def primary_language_for_movie(movie: Dict[str, Any]) -> str:
+def primary_language_for_movie(movie: Movie) -> str:
     """
     Choose the movie's primary language as the language of the newest 'added' link.
     This aligns 'language → newest year → name' grouping with the most recent update.
     """
-    links = [l for l in movie.get("links", []) if isinstance(l, dict)]
-    if not links:
+    if not movie.links:
         return ""
-    newest = max(links, key=lambda l: _to_date(l.get("added", "")))
-    return (newest.get("language") or "").lower()
+    newest = max(movie.links, key=lambda l: _to_date(l.added or ""))
+    return (newest.language or "").lower()
 
-def update_links(movie_data: Dict[str, Any]) -> None:
+def update_links(movie_data: Dict[str, Movie]) -> None:
     """
-    For each link, run a quick FFmpeg probe and rebuild the link dict with
+    For each link, run a quick FFmpeg probe and rebuild the link with
     a stable key order: status → added → language → url
     (If a link contains extra fields like 'headers', they’re ignored in output.)
     """
     # Prepare worklist
     jobs: List[Tuple[str, int, str, Dict[str, str]]] = []
     for movie_name, movie in movie_data.items():
-        for idx, link in enumerate(movie.get("links", [])):
-            if not isinstance(link, dict):
-                continue
-            url = link.get("url", "")
+        for idx, link in enumerate(movie.links):
+            url = link.url
             if not url:
                 continue
-            headers = link.get("headers") if isinstance(link.get("headers"), dict) else None
+            headers = link.extra.get("headers") if isinstance(link.extra.get("headers"), dict) else None
             jobs.append((movie_name, idx, url, headers))
 
     max_workers = min(WORKERS, max(1, len(jobs)))
@@ -107,36 +106,37 @@ def update_links(movie_data: Dict[str, Any]) -> None:
             except Exception:
                 pass
 
-            # Rebuild link dict in desired key order
-            old_link = movie_data[movie_name]["links"][idx]
-            new_link = {
-                "status": status,                                 # 1
-                "added": old_link.get("added", ""),               # 2
-                "language": old_link.get("language", ""),         # 3
-                "url": old_link.get("url", ""),                   # 4
-            }
-            movie_data[movie_name]["links"][idx] = new_link
+            # Rebuild link in desired key order
+            old_link = movie_data[movie_name].links[idx]
+            # (a key missing from the old link becomes "", an explicit null stays null)
+            new_link = MovieLink(
+                status=status,                                                        # 1
+                added=old_link.added if "added" in old_link else "",                  # 2
+                language=old_link.language if "language" in old_link else "",         # 3
+                url=old_link.url if "url" in old_link else "",                        # 4
+            )
+            movie_data[movie_name].links[idx] = new_link
 
             tag = "🟢" if status == "online" else "🔴"
             print(f"{tag} {movie_name} → {url}")
 
-def sort_movies(movie_data: Dict[str, Any]) -> Dict[str, Any]:
+def sort_movies(movie_data: Dict[str, Movie]) -> Dict[str, Movie]:
     """
     Order: language (of newest link) → year (newest first) → name (A→Z)
     """
     def key(item):
         name, data = item
         lang = primary_language_for_movie(data)
-        year = _to_int_year(data.get("year"))
+        year = _to_int_year(data.year)
         return (lang, -year, name.lower())
 
     # dict preserves insertion order, so make a new one from sorted items
     return dict(sorted(movie_data.items(), key=key))
 
-def print_summary(movie_data: Dict[str, Any]) -> None:
+def print_summary(movie_data: Dict[str, Movie]) -> None:
     total_movies = len(movie_data)
-    total_links = sum(len(m.get("links", [])) for m in movie_data.values())
-    online = sum(1 for m in movie_data.values() for l in m.get("links", []) if l.get("status") == "online")
+    total_links = sum(len(m.links) for m in movie_data.values())
+    online = sum(1 for m in movie_data.values() for l in m.links if l.status == "online")
     offline = total_links - online
 
     # Per-language breakdown (by newest link’s language)
@@ -155,17 +155,21 @@ def print_summary(movie_data: Dict[str, Any]) -> None:
 def atomic_write_json(path: Path, payload: Dict[str, Any]) -> None:
     tmp = path.with_suffix(path.suffix + ".tmp")
     with tmp.open("w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+        json_fast.dump(payload, f, indent=2)
     tmp.replace(path)
 
 def main():
     json_path = Path(JSON_FILE)
     with json_path.open("r", encoding="utf-8") as f:
-        movie_data = json.load(f)
+        try:
+            movie_data = movies_from_json(json_fast.load(f))
+        except SchemaError as e:
+            print(f"❌ Unexpected entry in {JSON_FILE}: {e}")
+            return
 
     update_links(movie_data)
     movie_data = sort_movies(movie_data)
-    atomic_write_json(json_path, movie_data)
+    atomic_write_json(json_path, movies_to_json(movie_data))
 
     print_summary(movie_data)
     print(f"\nUpdated and sorted {len(movie_data)} movies.")